@@ -0,0 +1,86 @@
+import argparse
+import os
+import sys
+
+#local imports
+from .ui.exam_config import ExamConfig, CONFIG_PATH
+from .utils.key import load_key
+from .core.batch_processing import collect_pdfs, run_batch
+from .utils.tracing import setup_logging
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m exam_manager.batch",
+        description="Grade a whole folder (or glob) of scanned exam PDFs without the GUI.",
+    )
+    parser.add_argument("inputs", nargs="+", help="PDF files, folders or glob patterns")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("-c", "--config", default=CONFIG_PATH, help="ExamConfig JSON file")
+    parser.add_argument("-o", "--report", default="batch_report.json", help="run report output path")
+    parser.add_argument("--log-level", help="override cfg.log_level (DEBUG, INFO, WARNING, OFF)")
+    parser.add_argument("--trace", choices=("json", "chrome"), help="write a <pdf>_trace.json per file")
+    parser.add_argument("--checkpoint", default="batch_checkpoint.jsonl",
+                        help="resume log: unchanged PDFs graded with the same config are skipped")
+    parser.add_argument("--no-checkpoint", action="store_true", help="grade everything, keep no resume log")
+    parser.add_argument("--force", action="store_true", help="re-grade every PDF but still update the resume log")
+    parser.add_argument("--db", help="SQLite result store (overrides cfg.result_store_path)")
+    parser.add_argument("--exam", help="exam name the results are filed under (overrides cfg.exam_name)")
+    parser.add_argument("--no-vis", action="store_true", help="write no page visualizations")
+    parser.add_argument("--stacked", action="store_true",
+                        help="each PDF is a whole class scanned in one go: split it into student copies by QR")
+    parser.add_argument("--debug-sample", choices=("off", "first", "rate", "near_threshold"),
+                        help="checkbox debug capture to <pdf>_debug.npz (overrides cfg.debug_cv/debug_sample)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    pdfs = collect_pdfs(args.inputs)
+    if not pdfs:
+        print("No PDF files found.", file=sys.stderr)
+        return 1
+
+    cfg = ExamConfig.from_json(args.config)
+    if args.log_level:
+        cfg.log_level = args.log_level
+    if args.trace:
+        cfg.trace_stages = True
+        cfg.trace_export = args.trace
+    if args.db:
+        cfg.result_store_path = args.db
+    if args.exam:
+        cfg.exam_name = args.exam
+    if args.no_vis:
+        cfg.save_visualizations = False
+    if args.debug_sample:
+        cfg.debug_cv = args.debug_sample != "off"
+        if cfg.debug_cv:
+            cfg.debug_sample = args.debug_sample
+    setup_logging(cfg)
+    key = load_key()
+    print(key[1])
+
+    def progress(done, total, record):
+        status = "ok" if record["status"] == "ok" else f"FAILED ({record.get('error')})"
+        if record.get("skipped"):
+            status = "unchanged, skipped"
+        print(f"[{done}/{total}] {os.path.basename(record['pdf'])}: {status} "
+              f"in {record.get('elapsed_s')}s")
+
+    print(f"Grading {len(pdfs)} PDF(s) on {args.workers} worker(s)...")
+    report = run_batch(pdfs, cfg, key, workers=args.workers, report_path=args.report, progress=progress,
+                       checkpoint_path=None if args.no_checkpoint or args.stacked else args.checkpoint,
+                       force=args.force, stacked=args.stacked)
+    print(f"Done: {report['succeeded']} ok ({report['skipped']} unchanged), {report['failed']} failed "
+          f"in {report['wall_time_s']}s "
+          f"({report['files_per_second']} files/s). Report: {args.report}")
+    for name, s in report["stages"].items():
+        print(f"  {name:<12} n={s['count']:<5} p50={s['p50_ms']:.1f} ms  p95={s['p95_ms']:.1f} ms")
+    return 0 if report["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.benchmarks.synthetic import make_exam_set, write_pdf, StubZoneModel
+from exam_manager.utils.tracing import setup_logging
+
+
+def time_stage(fn, items: list, repeat: int = 3) -> dict:
+    """
+    Run fn(item) for every item `repeat` times. Returns per-call timings (ms),
+    calls/second and the peak traced memory (MB) of a separate, untimed pass.
+    """
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            t0 = time.perf_counter()
+            fn(item)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+
+    tracemalloc.start()
+    for item in items:
+        fn(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "per_second": round(1000.0 / statistics.fmean(samples), 2) if samples else 0.0,
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+def _stub_detector(cfg: ExamConfig):
+    from exam_manager.core.main_yolo import YOLOZoneDetector
+    detector = YOLOZoneDetector.from_config(cfg)
+    if not detector.is_available():
+        detector.model = StubZoneModel()
+        detector.stubbed = True
+    return detector
+
+
+def run_benchmarks(n_pages: int = 10, dpi: int = 200, repeat: int = 3, seed: int = 0,
+                   only: list | None = None) -> dict:
+    """
+    Time every pipeline stage on synthetic pages. Stages whose external tool is
+    missing (poppler, tesseract, real YOLO weights) are reported as skipped/stubbed.
+    """
+    from cryptography.fernet import Fernet
+    from exam_manager.core.qr_encode import encrypt_student, make_qr_image
+    from exam_manager.core.pdf_processing import decode_qr_from_first_page
+    from exam_manager.core.grading_system import grade_exam
+    from exam_manager.core.page_yolo_pipline import process_exam_page_with_zone_detection
+    from exam_manager.utils.deskew_image import deskew_image, deskew
+    from exam_manager.utils.detection_pipline_processes import (
+        find_shapes_in_zone, score_checkbox_robust
+    )
+    from exam_manager.utils.pdf import convert_pdf_to_images, rasterize_pdf, render_pdf_page
+
+    cfg = ExamConfig()
+    cfg.debug_cv = False
+    cfg.use_layout_cache = False
+
+    key = Fernet.generate_key()
+    qr_img = make_qr_image(encrypt_student(Fernet(key), "Bench Student", "000001", "L3", "Bench U")).get_image()
+    pages = make_exam_set(n_pages, dpi=dpi, seed=seed, qr_image=qr_img)
+    images = [p["page"] for p in pages]
+    zones = [p["page"][y:y + h, x:x + w] for p in pages for (x, y, w, h) in [p["zone"]]]
+    candidates = [find_shapes_in_zone(z, cfg) for z in zones]
+    rois = [z[y:y + h, x:x + w] for z, boxes in zip(zones, candidates) for (x, y, w, h) in boxes]
+    results = [[{"question": i + 1, "grade": g} for i, g in enumerate(p["truth"])] for p in pages]
+    two_column = [p["page"] for p in make_exam_set(max(1, n_pages // 2), dpi=dpi, seed=seed, position="both")]
+    detector = _stub_detector(cfg)
+
+    tmp_dir = tempfile.mkdtemp(prefix="exam_bench_")
+    pdf_path = write_pdf(pages, os.path.join(tmp_dir, "bench.pdf"), dpi=dpi)
+
+    stages = {
+        "convert_pdf_to_images": (lambda p: convert_pdf_to_images(p, dpi=dpi, out_dir=tmp_dir), [pdf_path], n_pages),
+        "rasterize_pdf": (lambda p: rasterize_pdf(p, dpi=dpi), [pdf_path], n_pages),
+        "render_pdf_page": (lambda i: render_pdf_page(pdf_path, i, dpi=dpi), list(range(1, n_pages + 1)), 1),
+        "deskew_image": (lambda img: deskew_image(img, cfg), images, 1),
+        "deskew_estimate": (lambda img: deskew(img), images, 1),
+        "decode_qr_from_first_page": (lambda img: decode_qr_from_first_page(img, (key, ""), cfg), images[:1], 1),
+        "detect_grading_zone": (lambda img: detector.detect_grading_zone(img, cfg), images, 1),
+        "detect_grading_zones": (lambda img: detector.detect_grading_zones(img, cfg), two_column, 1),
+        "find_shapes_in_zone": (lambda z: find_shapes_in_zone(z, cfg), zones, 1),
+        "score_checkbox_robust": (lambda roi: score_checkbox_robust(roi, cfg), rois, 0),
+        "grade_exam": (lambda r: grade_exam(r, cfg), results, 0),
+        "page_pipeline": (lambda img: process_exam_page_with_zone_detection(img, cfg, detector, 1),
+                          images, 1),
+        "page_pipeline_two_columns": (lambda img: process_exam_page_with_zone_detection(img, cfg, detector, 1),
+                                      two_column, 1),
+    }
+
+    report = {
+        "pages": n_pages, "dpi": dpi, "repeat": repeat,
+        "zone_detector": "stub" if getattr(detector, "stubbed", False) else "yolo",
+        "stages": {},
+    }
+    for name, (fn, items, pages_per_call) in stages.items():
+        if only and name not in only:
+            continue
+        try:
+            stats = time_stage(fn, items, repeat)
+        except Exception as e:
+            # missing poppler / tesseract etc.
+            report["stages"][name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+        if pages_per_call:
+            stats["pages_per_second"] = round(stats["per_second"] * pages_per_call, 2)
+        report["stages"][name] = stats
+
+    # sanity check so a "fast" regression that breaks detection is not missed
+    page_results = [process_exam_page_with_zone_detection(img, cfg, detector, 1)[0] for img in images]
+    correct = sum(r["grade"] == t for res, p in zip(page_results, pages) for r, t in zip(res, p["truth"]))
+    report["accuracy"] = round(correct / max(1, sum(len(p["truth"]) for p in pages)), 4)
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Stages whose mean time grew by more than `tolerance` (fraction) vs the baseline."""
+    regressions = []
+    for name, stats in report["stages"].items():
+        base = baseline.get("stages", {}).get(name, {})
+        if "mean_ms" in stats and "mean_ms" in base and base["mean_ms"] > 0:
+            ratio = stats["mean_ms"] / base["mean_ms"]
+            if ratio > 1.0 + tolerance:
+                regressions.append(f"{name}: {base['mean_ms']:.2f} → {stats['mean_ms']:.2f} ms (x{ratio:.2f})")
+    return regressions
+
+
+def print_report(report: dict):
+    print(f"{report['pages']} synthetic pages @ {report['dpi']} dpi, zone detector: {report['zone_detector']}, "
+          f"accuracy: {report['accuracy']:.1%}")
+    print(f"{'stage':<28}{'mean ms':>10}{'p95 ms':>10}{'pages/s':>10}{'peak MB':>10}")
+    for name, s in report["stages"].items():
+        if "skipped" in s:
+            print(f"{name:<28}  skipped ({s['skipped']})")
+            continue
+        print(f"{name:<28}{s['mean_ms']:>10.2f}{s['p95_ms']:>10.2f}"
+              f"{s.get('pages_per_second', float('nan')):>10.2f}{s['peak_mb']:>10.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m exam_manager.benchmarks.bench_pipeline",
+                                     description="Stage-level benchmarks on synthetic exam pages.")
+    parser.add_argument("-n", "--pages", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="run only these stages")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    # pipeline INFO/DEBUG logs stay out of the report
+    setup_logging(level="WARNING")
+
+    report = run_benchmarks(args.pages, args.dpi, args.repeat, args.seed, args.only)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print("REGRESSION", r)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from exam_manager.ui.exam_config import ExamConfig, CONFIG_PATH
+from exam_manager.benchmarks.synthetic import make_exam_set
+from exam_manager.utils.tracing import setup_logging
+
+
+def zone_iou(a: tuple | None, b: tuple | None) -> float:
+    """IoU of two (x, y, w, h) zones; 1.0 when both are missing, 0.0 when only one is."""
+    if a is None or b is None:
+        return float(a is None and b is None)
+    from exam_manager.core.main_yolo import _iou
+    box = np.array([a[0], a[1], a[0] + a[2], a[1] + a[3]], dtype=np.float64)
+    other = np.array([[b[0], b[1], b[0] + b[2], b[1] + b[3]]], dtype=np.float64)
+    return float(_iou(box, other)[0])
+
+
+def time_backend(cfg: ExamConfig, pages: list, repeat: int = 3) -> tuple[dict, list]:
+    """
+    Load the detector for cfg.yolo_backend and time detect_grading_zone per page. Returns (stats, zones).
+    Raises RuntimeError when the detector fell back to torch (onnxruntime/openvino or the export missing).
+    """
+    from exam_manager.core.main_yolo import YOLOZoneDetector
+    from exam_manager.core.zone_backends import OnnxZoneModel, OpenVinoZoneModel
+
+    t0 = time.perf_counter()
+    detector = YOLOZoneDetector.from_config(cfg)
+    load_s = time.perf_counter() - t0
+    if detector.model is None:
+        raise RuntimeError(f"could not load {cfg.yolo_model_path}")
+    expected = {"onnx": OnnxZoneModel, "openvino": OpenVinoZoneModel}.get(cfg.yolo_backend)
+    if expected is not None and not isinstance(detector.model, expected):
+        raise RuntimeError(f"{cfg.yolo_backend} backend unavailable, loaded as {type(detector.model).__name__}")
+    detector.warmup()
+
+    samples, zones = [], []
+    for page in pages:
+        best = None
+        for _ in range(repeat):
+            t = time.perf_counter()
+            _, coords = detector.detect_grading_zone(page, cfg)
+            dt = (time.perf_counter() - t) * 1000.0
+            best = dt if best is None else min(best, dt)
+        samples.append(best)
+        zones.append(coords)
+    samples.sort()
+    stats = {
+        "loaded_as": type(detector.model).__name__,
+        "load_s": round(load_s, 2),
+        "mean_ms": round(statistics.fmean(samples), 2),
+        "p50_ms": round(samples[len(samples) // 2], 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        "pages_per_second": round(1000.0 / statistics.fmean(samples), 2),
+    }
+    return stats, zones
+
+
+def compare_backends(cfg: ExamConfig, pages: list, variants: list, repeat: int = 3) -> dict:
+    """
+    Run every (backend, int8) variant on the same pages; zones are compared by IoU
+    with the PyTorch (ultralytics) result, which is always run first as the reference.
+    """
+    report = {"pages": len(pages), "threads": cfg.yolo_threads, "imgsz": cfg.yolo_imgsz, "variants": {}}
+    reference = None
+    for backend, int8 in [("torch", False)] + [v for v in variants if v != ("torch", False)]:
+        name = backend + ("-int8" if int8 else "")
+        cfg.yolo_backend, cfg.yolo_int8 = backend, int8
+        try:
+            stats, zones = time_backend(cfg, pages, repeat)
+        except Exception as e:
+            report["variants"][name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+        if reference is None:
+            reference = zones
+        ious = [zone_iou(z, r) for z, r in zip(zones, reference)]
+        stats["mean_iou"] = round(statistics.fmean(ious), 4)
+        stats["min_iou"] = round(min(ious), 4)
+        stats["zones_missed"] = sum(z is None and r is not None for z, r in zip(zones, reference))
+        report["variants"][name] = stats
+    return report
+
+
+def print_report(report: dict):
+    print(f"{report['pages']} pages, imgsz {report['imgsz']}, threads {report['threads'] or 'default'}")
+    print(f"{'variant':<16}{'loaded as':<20}{'mean ms':>9}{'p95 ms':>9}{'pages/s':>9}{'mean IoU':>10}"
+          f"{'min IoU':>9}{'missed':>8}")
+    for name, s in report["variants"].items():
+        if "skipped" in s:
+            print(f"{name:<16}skipped ({s['skipped']})")
+            continue
+        print(f"{name:<16}{s['loaded_as']:<20}{s['mean_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['pages_per_second']:>9.2f}"
+              f"{s['mean_iou']:>10.4f}{s['min_iou']:>9.4f}{s['zones_missed']:>8}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m exam_manager.benchmarks.compare_backends",
+        description="Compare zone detection latency and IoU of the torch, ONNX Runtime and OpenVINO backends.",
+    )
+    parser.add_argument("pdfs", nargs="*", help="scanned PDFs to use (default: synthetic pages)")
+    parser.add_argument("-c", "--config", default=CONFIG_PATH, help="ExamConfig JSON file")
+    parser.add_argument("-n", "--pages", type=int, default=20, help="number of pages to time")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="runs per page (best is kept)")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "openvino"],
+                        choices=("torch", "onnx", "openvino"))
+    parser.add_argument("--no-int8", action="store_true", help="skip the int8 variants")
+    parser.add_argument("--threads", type=int, help="intra-op threads (overrides yolo_threads)")
+    parser.add_argument("-o", "--output", help="write the report as JSON")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    cfg = ExamConfig.from_json(args.config)
+    setup_logging(cfg, level="WARNING")
+    if not os.path.exists(cfg.yolo_model_path):
+        print(f"YOLO weights not found at {cfg.yolo_model_path}", file=sys.stderr)
+        return 1
+    if args.threads is not None:
+        cfg.yolo_threads = args.threads
+
+    if args.pdfs:
+        from exam_manager.utils.pdf import rasterize_pdf
+        pages = [p for pdf in args.pdfs for p in rasterize_pdf(pdf, dpi=cfg.raster_dpi)][:args.pages]
+    else:
+        pages = [p["page"] for p in make_exam_set(args.pages, dpi=cfg.raster_dpi)]
+
+    variants = [(b, int8) for b in args.backends for int8 in ((False,) if args.no_int8 else (False, True))
+                if not (b == "torch" and int8)]
+    report = compare_backends(cfg, pages, variants, args.repeat)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
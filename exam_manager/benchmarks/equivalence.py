@@ -0,0 +1,58 @@
+import argparse
+import json
+import sys
+
+import cv2
+import numpy as np
+
+from exam_manager.benchmarks.synthetic import A4_INCHES, make_exam_page
+from exam_manager.utils.tracing import setup_logging
+
+
+PAGE_SIZES = {"A4": A4_INCHES, "Letter": (8.5, 11.0)}
+
+
+def check_skew(dpis=(150, 200, 300), sizes=("A4", "Letter"), angles=(0.5, 1.5, 2.5, -1.0),
+               tolerance: float = 0.15, seed: int = 0) -> dict:
+    """
+    Rotate a synthetic page of every size and DPI by known angles; estimate_skew_angle
+    must find the opposite angle within `tolerance` degrees.
+    Returns {"<size>@<dpi>": {"expected": [...], "found": [...], "mismatches": n}}.
+    """
+    from exam_manager.utils.deskew_image import estimate_skew_angle
+    report = {}
+    for size in sizes:
+        wi, hi = PAGE_SIZES[size]
+        for dpi in dpis:
+            page = make_exam_page(dpi=dpi, seed=seed)["page"]
+            W, H = int(round(wi * dpi)), int(round(hi * dpi))
+            canvas = np.full((H, W) + page.shape[2:], 255, np.uint8)
+            h, w = min(H, page.shape[0]), min(W, page.shape[1])
+            canvas[:h, :w] = page[:h, :w]
+            found = []
+            for angle in angles:
+                M = cv2.getRotationMatrix2D((W / 2.0, H / 2.0), angle, 1.0)
+                rotated = cv2.warpAffine(canvas, M, (W, H), borderValue=(255, 255, 255))
+                found.append(round(estimate_skew_angle(rotated), 2))
+            mismatches = sum(int(abs(f + a) > tolerance) for f, a in zip(found, angles))
+            report[f"{size}@{dpi}"] = {"expected": [-a for a in angles], "found": found, "mismatches": mismatches}
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m exam_manager.benchmarks.equivalence",
+                                     description="Check that deskew finds known angles on synthetic pages "
+                                                 "of every size and DPI.")
+    parser.add_argument("--dpi", type=int, nargs="+", default=[150, 200, 300])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    setup_logging(level="WARNING")
+
+    checks = {"skew": check_skew(args.dpi, seed=args.seed)}
+    print(json.dumps(checks, indent=2))
+    failed = any(r["mismatches"] for check in checks.values() for r in check.values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
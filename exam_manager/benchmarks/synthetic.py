@@ -0,0 +1,164 @@
+import numpy as np
+import cv2
+
+from exam_manager.utils.helpers import QR_DEFAULT_REGION, QR_REFERENCE_WIDTH
+from exam_manager.core.zone_backends import Boxes, Result
+
+
+A4_INCHES = (8.27, 11.69)
+MARK_STYLES = ("checked", "filled", "x-marked", "cross", "dot", "line")
+
+
+def _mm(v: float, dpi: int) -> int:
+    return int(round(v * dpi / 25.4))
+
+
+def _draw_mark(page: np.ndarray, x: int, y: int, s: int, style: str, rng):
+    ink = int(rng.integers(10, 60))
+    t = max(1, s // 8)
+    if style == "filled":
+        cv2.rectangle(page, (x + t, y + t), (x + s - t, y + s - t), ink, -1)
+    elif style in ("x-marked", "cross"):
+        m = s // 5
+        cv2.line(page, (x + m, y + m), (x + s - m, y + s - m), ink, t + 1)
+        cv2.line(page, (x + s - m, y + m), (x + m, y + s - m), ink, t + 1)
+    elif style == "checked":
+        cv2.line(page, (x + s // 5, y + s // 2), (x + s // 2, y + s - s // 5), ink, t + 1)
+        cv2.line(page, (x + s // 2, y + s - s // 5), (x + s - s // 6, y + s // 6), ink, t + 1)
+    elif style == "dot":
+        cv2.circle(page, (x + s // 2, y + s // 2), max(2, s // 4), ink, -1)
+    else:  # line
+        cv2.line(page, (x + s // 6, y + s // 2), (x + s - s // 6, y + s // 2), ink, t + 1)
+
+
+def make_exam_page(n_questions: int = 8, position: str = "left", spacing: str = "compact",
+                   dpi: int = 200, skew: float = 0.0, noise: float = 6.0, seed: int = 0,
+                   qr_image=None, option_labels=("bon", "moyen", "non"), blank_ratio: float = 0.1) -> dict:
+    """
+    Render a scanned-looking exam page in the layout of generator/newgen.html:
+    header, QR in the top-right corner, a grading column (left, right or both) with one
+    "Q<n>" block of 3 stacked checkboxes per question, random marks, skew and noise.
+
+    Returns {"page": BGR image, "truth": [label or "missing", ...],
+             "zone": (x, y, w, h) of the (first) grading column before skew,
+             "zones": every column in reading order, "position": ...}.
+    """
+    rng = np.random.default_rng(seed)
+    w, h = int(A4_INCHES[0] * dpi), int(A4_INCHES[1] * dpi)
+    page = np.full((h, w), 245, np.uint8)
+    font_scale = dpi / 200.0
+
+    # --- header + body text
+    cv2.putText(page, "Universite - Examen Final", (_mm(60, dpi), _mm(20, dpi)), cv2.FONT_HERSHEY_SIMPLEX,
+                1.2 * font_scale, 0, max(1, int(2 * font_scale)))
+    cv2.line(page, (_mm(20, dpi), _mm(30, dpi)), (w - _mm(20, dpi), _mm(30, dpi)), 0, max(1, int(2 * font_scale)))
+    body_x = _mm(40, dpi) if position == "left" else _mm(20, dpi)
+    for i in range(int(rng.integers(25, 45))):
+        words = int(rng.integers(4, 12))
+        cv2.putText(page, " ".join("lorem" for _ in range(words)), (body_x, _mm(45, dpi) + i * _mm(5.5, dpi)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6 * font_scale, 30, 1)
+
+    # --- QR code
+    if qr_image is not None:
+        scale = w / float(QR_REFERENCE_WIDTH)
+        qx, qy, qw, qh = (int(round(v * scale)) for v in QR_DEFAULT_REGION)
+        qr = np.array(qr_image.convert("L")) if hasattr(qr_image, "convert") else qr_image
+        page[qy:qy + qh, qx:qx + qw] = cv2.resize(qr, (qw, qh), interpolation=cv2.INTER_NEAREST)
+
+    # --- grading column(s); "both" puts questions 1..n in the left column and n+1..2n in the right one
+    col_w = _mm(25, dpi) + 16
+    col_y = _mm(80, dpi)
+    box = _mm(3, dpi)
+    row_gap = _mm(0.8 if spacing == "compact" else 1.6, dpi)
+
+    truth = []
+    zones = []
+    for side in (("left", "right") if position == "both" else (position,)):
+        col_x = _mm(5, dpi) if side == "left" else w - _mm(5, dpi) - col_w
+        y = col_y + _mm(6, dpi)
+        cv2.putText(page, "NOTATION", (col_x + 8, col_y + _mm(4, dpi)), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.45 * font_scale, 0, 1)
+        for _ in range(n_questions):
+            cv2.putText(page, f"Q{len(truth) + 1}", (col_x + 8, y + _mm(3, dpi)), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.45 * font_scale, 0, 1)
+            y += _mm(3.5, dpi)
+            pick = -1 if rng.random() < blank_ratio else int(rng.integers(0, len(option_labels)))
+            truth.append(option_labels[pick] if pick >= 0 else "missing")
+            for o, label in enumerate(("Bon", "Moy", "Faib")[:len(option_labels)]):
+                bx = col_x + 10
+                cv2.rectangle(page, (bx, y), (bx + box, y + box), 0, max(1, int(2 * font_scale)))
+                cv2.putText(page, label, (bx + box + 8, y + box - 2), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.45 * font_scale, 0, 1)
+                if o == pick:
+                    _draw_mark(page, bx, y, box, MARK_STYLES[int(rng.integers(0, len(MARK_STYLES)))], rng)
+                y += box + row_gap
+            y += 2 * row_gap
+        col_h = y - col_y + _mm(2, dpi)
+        cv2.rectangle(page, (col_x, col_y), (col_x + col_w, col_y + col_h), 40, max(2, int(2 * font_scale)))
+        zones.append((col_x, col_y, col_w, col_h))
+
+    # --- scan artefacts: skew, blur, noise
+    if skew:
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), skew, 1.0)
+        page = cv2.warpAffine(page, M, (w, h), flags=cv2.INTER_LINEAR, borderValue=245)
+    page = cv2.GaussianBlur(page, (3, 3), 0.6)
+    if noise:
+        page = np.clip(page.astype(np.int16) + rng.normal(0, noise, page.shape).astype(np.int16), 0, 255).astype(np.uint8)
+
+    return {
+        "page": cv2.cvtColor(page, cv2.COLOR_GRAY2BGR),
+        "truth": truth,
+        "zone": zones[0],
+        "zones": zones,
+        "position": position,
+    }
+
+
+def make_exam_set(n_pages: int = 10, dpi: int = 200, max_skew: float = 1.5, seed: int = 0,
+                  qr_image=None, **kwargs) -> list:
+    """Pages alternating left/right columns and compact/spaced rows with random skew."""
+    rng = np.random.default_rng(seed)
+    pages = []
+    position = kwargs.pop("position", None)
+    for i in range(n_pages):
+        pages.append(make_exam_page(
+            position=position or ("left" if i % 2 == 0 else "right"),
+            spacing="compact" if i % 3 else "spaced",
+            dpi=dpi, skew=float(rng.uniform(-max_skew, max_skew)), seed=seed + i,
+            qr_image=qr_image if i == 0 else None, **kwargs))
+    return pages
+
+
+def write_pdf(pages: list, pdf_path: str, dpi: int = 200) -> str:
+    from PIL import Image
+    images = [Image.fromarray(cv2.cvtColor(p["page"], cv2.COLOR_BGR2RGB)) for p in pages]
+    images[0].save(pdf_path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+    return pdf_path
+
+
+class StubZoneModel:
+    """
+    Stand-in for the ultralytics model when no weights are available: finds the
+    tall framed rectangles (grading columns) with OpenCV and returns them in
+    the ultralytics result layout (result.boxes.conf / .xyxy), tallest first.
+    """
+
+    def _detect(self, img):
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+        bw = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+        contours, _ = cv2.findContours(bw, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        found = []
+        for cnt in contours:
+            x, y, w, h = cv2.boundingRect(cnt)
+            if h > 3 * w and h > small.shape[0] * 0.15:
+                found.append((x * 2, y * 2, w * 2, h * 2))
+        found.sort(key=lambda b: -b[3])
+        # tallest first, so a single-zone caller still gets the column it expects
+        return Boxes([[x, y, x + w, y + h] for x, y, w, h in found],
+                           [0.9 - 0.01 * i for i in range(len(found))])
+
+    def __call__(self, images, conf=0.5, verbose=False):
+        if isinstance(images, np.ndarray):
+            images = [images]
+        return [Result(self._detect(img)) for img in images]
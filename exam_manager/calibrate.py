@@ -0,0 +1,63 @@
+import argparse
+import json
+import sys
+import time
+
+#local imports
+from .ui.exam_config import ExamConfig, CONFIG_PATH
+from .core.calibration import (
+    THRESHOLDS, load_labels, labelled_features, threshold_sweep, best_setting, evaluate_config
+)
+from .utils.tracing import setup_logging
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m exam_manager.calibrate",
+        description="Sweep the checkbox thresholds against hand-labelled boxes "
+                    "(uses the cached <pdf>_features.npz of the labelled PDFs).",
+    )
+    parser.add_argument("labels", help="CSV with pdf, question, option, checked columns")
+    parser.add_argument("-c", "--config", default=CONFIG_PATH, help="ExamConfig JSON file")
+    parser.add_argument("--metric", choices=("f1", "precision", "recall"), default="f1")
+    parser.add_argument("--min-precision", type=float, default=0.0,
+                        help="ignore settings below this precision")
+    parser.add_argument("--top", type=int, default=5, help="number of settings to show")
+    parser.add_argument("--write", action="store_true", help="save the best setting to the config file")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    cfg = ExamConfig.from_json(args.config)
+    setup_logging(cfg)
+
+    inner, edge, valid, truth = labelled_features(load_labels(args.labels), cfg)
+    if truth.size == 0:
+        print("No labelled checkbox matched a cached feature file.", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+    sweep = threshold_sweep(inner, edge, valid, truth)
+    ranked = best_setting(sweep, args.metric, args.min_precision, args.top)
+    elapsed = time.perf_counter() - t0
+    if not ranked:
+        print(f"No setting reaches precision {args.min_precision}.", file=sys.stderr)
+        return 1
+
+    print(f"{truth.size} labelled boxes ({int(truth.sum())} checked), "
+          f"{sweep['f1'].size} combinations in {elapsed:.2f}s")
+    print("current:", json.dumps(evaluate_config(inner, edge, valid, truth, cfg)))
+    for rank, setting in enumerate(ranked, start=1):
+        print(f"#{rank}:", json.dumps(setting))
+
+    if args.write:
+        for name in THRESHOLDS:
+            setattr(cfg, name, ranked[0][name])
+        cfg.to_json(args.config)
+        print(f"Best setting written to {args.config}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
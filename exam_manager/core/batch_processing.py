@@ -0,0 +1,294 @@
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import multiprocessing as mp
+
+import cv2
+
+from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.utils.tracing import Tracer, setup_logging, summarize_durations
+
+
+# Per-process state, filled once by _init_worker so the YOLO weights are
+# loaded a single time per worker instead of once per PDF.
+_worker_cfg = None
+_worker_detector = None
+_worker_key = None
+_worker_layout_cache = None
+
+
+def collect_pdfs(inputs: list) -> list:
+    """
+    Expand folders and glob patterns into a sorted, de-duplicated list of PDF paths.
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "*.pdf")) + glob.glob(os.path.join(item, "*.PDF"))
+        elif any(ch in item for ch in "*?["):
+            matches = glob.glob(item, recursive=True)
+        else:
+            matches = [item]
+        found.extend(m for m in matches if m.lower().endswith(".pdf"))
+
+    seen = set()
+    pdfs = []
+    for p in sorted(os.path.abspath(m) for m in found):
+        if p not in seen:
+            seen.add(p)
+            pdfs.append(p)
+    return pdfs
+
+
+def _init_worker(cfg: ExamConfig, key):
+    global _worker_cfg, _worker_detector, _worker_key, _worker_layout_cache
+    from exam_manager.core.main_yolo import YOLOZoneDetector
+    from exam_manager.core.layout_cache import LayoutCache
+
+    # every core already runs its own worker, keep each one single-threaded
+    cv2.setNumThreads(1)
+    # spawned workers start with an unconfigured root logger
+    setup_logging(cfg)
+    if cfg.yolo_backend == "torch":
+        try:
+            import torch
+            torch.set_num_threads(1)
+        except ImportError:
+            pass
+
+    _worker_cfg = cfg
+    _worker_key = key
+    _worker_detector = YOLOZoneDetector.from_config(cfg, threads=cfg.yolo_threads or 1)
+    _worker_layout_cache = LayoutCache.from_config(cfg)
+    # warm here, once per process: a task sent to "every worker" may run on any of them
+    if cfg.yolo_warmup and _worker_detector.is_available():
+        _worker_detector.warmup()
+
+
+def _worker_ready(_=None) -> int:
+    """No-op task that makes the pool start a worker (warmed by _init_worker). Returns the pid."""
+    return os.getpid()
+
+
+def _export_for_workers(cfg: ExamConfig):
+    if cfg.use_yolo_zone_detection and cfg.yolo_backend != "torch" and os.path.exists(cfg.yolo_model_path):
+        # export once here instead of racing to write the same file from every worker
+        from exam_manager.core.zone_backends import export_onnx
+        try:
+            export_onnx(cfg.yolo_model_path, cfg.yolo_imgsz, cfg.yolo_int8)
+        except Exception as e:
+            logging.error(f"ONNX export failed ({e}), workers fall back to torch")
+
+
+def _scan_pages(pdf_path: str, page_nos) -> list:
+    from exam_manager.core.stack_split import scan_qr_pages
+    return scan_qr_pages(pdf_path, page_nos, _worker_key, _worker_cfg)
+
+
+def _grade_one(pdf_path: str, pages: tuple | None = None, keep_summary: bool = False) -> dict:
+    from exam_manager.core.pdf_processing import process_pdf, segment_path
+
+    record = {"pdf": segment_path(pdf_path, pages), "status": "ok", "pid": os.getpid()}
+    if pages is not None:
+        record.update(source_pdf=pdf_path, pages=list(pages))
+    tracer = Tracer() if _worker_cfg.trace_stages else None
+    t0 = time.perf_counter()
+    try:
+        summary = process_pdf(pdf_path, _worker_cfg, _worker_detector, _worker_key,
+                              layout_cache=_worker_layout_cache, tracer=tracer, pages=pages)
+        record.update({
+            "student_id": summary["student"].get("id"),
+            "student_name": summary["student"].get("name"),
+            "qr_error": summary["student"].get("error"),
+            "total_questions": summary["total_questions"],
+            "score": summary["grading"]["score"],
+            "letter": summary["grading"]["letter"],
+            "warnings": summary["validation"].get("warnings", []),
+            "output": os.path.splitext(record["pdf"])[0] + "_grades.json",
+        })
+        if _worker_cfg.result_store_path or keep_summary:
+            # the parent process files it in the result store (or hands it to a client)
+            record["summary"] = summary
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    if tracer is not None:
+        # raw durations so run_batch can compute run-wide percentiles
+        record["stage_ms"] = tracer.durations()
+    return record
+
+
+def _split_stacks(pool, pdf_paths: list, cfg: ExamConfig, workers: int) -> list:
+    """
+    QR-scan every page of the stacked scans on the pool (contiguous chunks, so all
+    workers help even with one PDF) and return one (pdf_path, (first, last)) job per student copy.
+    A PDF that cannot be scanned becomes a single whole-PDF job, so its error is reported.
+    """
+    from exam_manager.core.stack_split import split_segments
+    from exam_manager.utils.pdf import pdf_page_count
+
+    jobs, scans = [], {}
+    for pdf in pdf_paths:
+        try:
+            n_pages = pdf_page_count(pdf)
+        except Exception as e:
+            logging.error(f"{pdf}: cannot read the page count ({e})")
+            jobs.append((pdf, None))
+            continue
+        chunk = max(1, -(-n_pages // (workers * 4)))
+        scans[pdf] = [pool.submit(_scan_pages, pdf, range(a, min(n_pages, a + chunk - 1) + 1))
+                      for a in range(1, n_pages + 1, chunk)]
+
+    for pdf, futures in scans.items():
+        try:
+            pages = [s for fut in futures for s in fut.result()]
+        except Exception as e:
+            logging.error(f"{pdf}: QR scan failed ({type(e).__name__}: {e})")
+            jobs.append((pdf, None))
+            continue
+        segments = split_segments(pages, cfg.stack_pages_per_student)
+        logging.info(f"{os.path.basename(pdf)}: {len(pages)} pages, {len(segments)} student copies")
+        jobs.extend((pdf, seg["pages"]) for seg in segments)
+    return jobs
+
+
+def run_batch(pdf_paths: list, cfg: ExamConfig, key, workers: int | None = None,
+              report_path: str | None = None, progress=None, store_every: int = 50,
+              checkpoint_path: str | None = None, force: bool = False, stacked: bool = False) -> dict:
+    """
+    Grade every PDF on a process pool (one YOLOZoneDetector per worker) and
+    return a consolidated run report. The report is also written to `report_path` if given.
+    `progress(done, total, record)` is called as each file finishes.
+    With cfg.result_store_path set, results are saved to the SQLite store as one
+    run, `store_every` files per transaction.
+    With `checkpoint_path`, PDFs already graded with the same content and config
+    fingerprint are skipped (unless `force`) and every finished file is logged
+    there immediately, so an interrupted run resumes where it stopped.
+    With `stacked`, every PDF is a whole class scanned in one go: its pages are
+    split into per-student copies by QR (core.stack_split) and the copies are
+    graded concurrently, one record per student. Checkpoints are not used then.
+    """
+    started = datetime.now().isoformat(timespec="seconds")
+    t0 = time.perf_counter()
+    records = []
+    if stacked and checkpoint_path:
+        logging.warning("Checkpoints are per PDF, not used for stacked class scans")
+        checkpoint_path = None
+
+    checkpoint = fingerprint = None
+    hashes = {}
+    todo = list(pdf_paths)
+    if checkpoint_path:
+        from exam_manager.core.checkpoint import BatchCheckpoint, config_fingerprint
+        checkpoint = BatchCheckpoint(checkpoint_path)
+        fingerprint = config_fingerprint(cfg)
+        todo = []
+        for p in pdf_paths:
+            try:
+                hashes[p] = checkpoint.content_hash(p)
+            except OSError:
+                todo.append(p)   # missing/unreadable, let the worker report it
+                continue
+            if not force and checkpoint.is_done(p, hashes[p], fingerprint):
+                record = checkpoint.record_for(p)
+                record["skipped"] = True
+                records.append(record)
+            else:
+                todo.append(p)
+        if records:
+            logging.info(f"Checkpoint: {len(records)} unchanged PDF(s) skipped, {len(todo)} to grade")
+            if progress is not None:
+                for done, record in enumerate(records, start=1):
+                    progress(done, len(pdf_paths), record)
+
+    workers = workers or os.cpu_count() or 1
+    if not stacked:
+        # a stacked scan has many copies to share out, a plain PDF is one job
+        workers = max(1, min(workers, len(todo) or 1))
+
+    store = run_id = None
+    to_store = []
+    if cfg.result_store_path:
+        from exam_manager.core.result_store import ResultStore, exam_name
+        store = ResultStore(cfg.result_store_path)
+        run_id = store.start_run(exam_name(cfg), cfg, source="batch")
+
+    def flush_store():
+        if store is not None and to_store:
+            store.save_many(to_store, exam_name(cfg), run_id)
+            to_store.clear()
+
+    if todo:
+        _export_for_workers(cfg)
+        # spawn: torch/ultralytics are not fork-safe once initialised
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(cfg, key)) as pool:
+            jobs = _split_stacks(pool, todo, cfg, workers) if stacked else [(p, None) for p in todo]
+            total = len(records) + len(jobs) if stacked else len(pdf_paths)
+            futures = {pool.submit(_grade_one, *job): job for job in jobs}
+            for fut in as_completed(futures):
+                try:
+                    record = fut.result()
+                except Exception as e:
+                    # worker crashed (e.g. killed by OOM) before it could report
+                    from exam_manager.core.pdf_processing import segment_path
+                    record = {"pdf": segment_path(*futures[fut]), "status": "failed",
+                              "error": f"{type(e).__name__}: {e}", "elapsed_s": None}
+                records.append(record)
+                if checkpoint is not None and record["pdf"] in hashes:
+                    checkpoint.mark(record["pdf"], hashes[record["pdf"]], fingerprint,
+                                    {k: v for k, v in record.items() if k not in ("summary", "stage_ms")})
+                if "summary" in record:
+                    to_store.append((record["pdf"], record.pop("summary")))
+                    if len(to_store) >= store_every:
+                        flush_store()
+                if record["status"] != "ok":
+                    logging.error(f"{record['pdf']}: {record.get('error')}")
+                if progress is not None:
+                    progress(len(records), total, record)
+
+    if store is not None:
+        flush_store()
+        store.finish_run(run_id)
+        store.close()
+
+    records.sort(key=lambda r: (r.get("source_pdf", r["pdf"]), r.get("pages", [0])[0]))
+    stage_ms = {}
+    for r in records:
+        for name, values in r.pop("stage_ms", {}).items():
+            stage_ms.setdefault(name, []).extend(values)
+    wall = time.perf_counter() - t0
+    timings = [r["elapsed_s"] for r in records if r.get("elapsed_s") is not None and not r.get("skipped")]
+    failed = [r for r in records if r["status"] != "ok"]
+    skipped = sum(1 for r in records if r.get("skipped"))
+
+    report = {
+        "started": started,
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "workers": workers,
+        "total_files": len(pdf_paths),
+        "student_copies": len(records) if stacked else None,
+        "succeeded": len(records) - len(failed),
+        "failed": len(failed),
+        "skipped": skipped,
+        "wall_time_s": round(wall, 3),
+        "files_per_second": round((len(records) - skipped) / wall, 3) if wall > 0 else 0.0,
+        "mean_file_time_s": round(sum(timings) / len(timings), 3) if timings else 0.0,
+        "max_file_time_s": max(timings) if timings else 0.0,
+        "stages": summarize_durations(stage_ms),
+        "result_store": {"path": cfg.result_store_path, "run_id": run_id} if store is not None else None,
+        "failures": [{"pdf": r["pdf"], "error": r.get("error")} for r in failed],
+        "files": records,
+    }
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, indent=2, ensure_ascii=False))
+
+    return report
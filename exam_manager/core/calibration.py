@@ -0,0 +1,150 @@
+import csv
+import logging
+import os
+
+import numpy as np
+
+from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.core.feature_cache import features_path, load_features
+
+
+THRESHOLDS = ("min_inner_on_ratio", "strong_inner_on_ratio", "edge_density_thr", "min_vote_score")
+
+DEFAULT_GRID = {
+    "min_inner_on_ratio": np.round(np.arange(0.02, 0.201, 0.01), 3),
+    "strong_inner_on_ratio": np.round(np.arange(0.05, 0.401, 0.025), 3),
+    "edge_density_thr": np.round(np.arange(0.0, 0.201, 0.02), 3),
+    "min_vote_score": np.round(np.arange(0.05, 0.401, 0.025), 3),
+}
+
+
+def load_labels(csv_path: str) -> list[dict]:
+    """
+    Hand labels, one row per checkbox: pdf, question, option, checked.
+    `option` is an option label or a 0-based index, `checked` is 1/0 (or yes/no, true/false).
+    Relative PDF paths are resolved against the CSV folder.
+    """
+    base = os.path.dirname(os.path.abspath(csv_path))
+    labels = []
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            row = {k.strip().lower(): (v or "").strip() for k, v in row.items()}
+            pdf = row["pdf"] if os.path.isabs(row["pdf"]) else os.path.join(base, row["pdf"])
+            labels.append({
+                "pdf": os.path.normpath(pdf),
+                "question": int(row["question"]),
+                "option": row["option"],
+                "checked": row["checked"].lower() in ("1", "yes", "true", "x", "y", "oui"),
+            })
+    return labels
+
+
+def labelled_features(labels: list, cfg: ExamConfig) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Match labels with the cached features of their PDFs (<pdf>_features.npz).
+    Returns (inner_ratio, edge_ratio, valid, truth) arrays; unmatched labels are dropped with a warning.
+    """
+    option_index = {name: i for i, name in enumerate(cfg.option_labels)}
+    inner, edge, valid, truth = [], [], [], []
+    by_pdf = {}
+    for label in labels:
+        by_pdf.setdefault(label["pdf"], []).append(label)
+
+    for pdf, pdf_labels in by_pdf.items():
+        path = features_path(pdf)
+        if not os.path.exists(path):
+            logging.warning(f"No cached features for {pdf}, {len(pdf_labels)} label(s) skipped")
+            continue
+        feats = load_features(path)
+        lookup = {(int(q), int(o)): k for k, (q, o) in enumerate(zip(feats["question"], feats["option"]))}
+        for label in pdf_labels:
+            opt = label["option"]
+            opt = int(opt) if opt.isdigit() else option_index.get(opt)
+            k = lookup.get((label["question"], opt))
+            if k is None:
+                logging.warning(f"{os.path.basename(pdf)}: no box for Q{label['question']} option {label['option']}")
+                continue
+            inner.append(feats["inner_ratio"][k])
+            edge.append(feats["edge_ratio"][k])
+            valid.append(feats["valid"][k])
+            truth.append(label["checked"])
+
+    return (np.asarray(inner, dtype=np.float64), np.asarray(edge, dtype=np.float64),
+            np.asarray(valid, dtype=bool), np.asarray(truth, dtype=bool))
+
+
+def threshold_sweep(inner: np.ndarray, edge: np.ndarray, valid: np.ndarray, truth: np.ndarray,
+                    grid: dict | None = None) -> dict:
+    """
+    Evaluate checkbox_decision for every combination of the four thresholds at once.
+
+    checked = strong | vote | weak, where strong depends only on strong_inner_on_ratio,
+    vote only on min_vote_score and weak on (min_inner_on_ratio, edge_density_thr).
+    With x = strong|vote and w = weak as 0/1 matrices, the counts over all
+    combinations come from matrix products:
+        |x or w|         = |x| + |w| - x·w
+        |(x or w) and y| = x·y + w·y - (x∘y)·w
+    Returns a dict with the grid axes and tp/fp/fn/precision/recall/f1 arrays
+    shaped (min_inner, strong, edge, vote).
+    """
+    grid = {k: np.asarray(v, dtype=np.float64) for k, v in (grid or DEFAULT_GRID).items()}
+    y = (truth & valid).astype(np.float32)   # an unusable box is never checked
+    v = valid.astype(np.float32)
+    score = np.clip(inner + 0.5 * edge, 0.0, 1.0)
+
+    g_min, g_strong = grid["min_inner_on_ratio"], grid["strong_inner_on_ratio"]
+    g_edge, g_vote = grid["edge_density_thr"], grid["min_vote_score"]
+
+    strong = inner[None, :] >= g_strong[:, None]                                  # (S, N)
+    vote = score[None, :] >= g_vote[:, None]                                      # (V, N)
+    x = ((strong[:, None, :] | vote[None, :, :]).reshape(-1, inner.size)) * v     # (S*V, N)
+    w = (((inner[None, :] >= g_min[:, None])[:, None, :]
+          & (edge[None, :] >= g_edge[:, None])[None, :, :]).reshape(-1, inner.size)) * v  # (M*E, N)
+    x, w = x.astype(np.float32), w.astype(np.float32)
+
+    xw = x @ w.T                                                                  # (S*V, M*E)
+    predicted = x.sum(axis=1)[:, None] + w.sum(axis=1)[None, :] - xw
+    tp = (x @ y)[:, None] + (w @ y)[None, :] - (x * y) @ w.T
+    positives = float(truth.sum())
+
+    shape = (g_strong.size, g_vote.size, g_min.size, g_edge.size)
+    # → (min_inner, strong, edge, vote)
+    tp = np.rint(tp).reshape(shape).transpose(2, 0, 3, 1)
+    predicted = np.rint(predicted).reshape(shape).transpose(2, 0, 3, 1)
+    fp = predicted - tp
+    fn = positives - tp
+    precision = np.where(predicted > 0, tp / np.maximum(predicted, 1), 1.0)
+    recall = tp / positives if positives else np.ones_like(tp)
+    f1 = np.where(precision + recall > 0, 2 * precision * recall / np.maximum(precision + recall, 1e-12), 0.0)
+    return {"grid": grid, "tp": tp, "fp": fp, "fn": fn,
+            "precision": precision, "recall": recall, "f1": f1, "n": int(truth.size)}
+
+
+def best_setting(sweep: dict, metric: str = "f1", min_precision: float = 0.0, top: int = 5) -> list[dict]:
+    """
+    Rank the swept combinations by `metric` (f1, precision or recall), keeping only
+    those with precision >= min_precision. Returns the `top` settings as dicts.
+    """
+    values = np.where(sweep["precision"] >= min_precision, sweep[metric], -1.0).ravel()
+    # ties: prefer higher f1, then the earliest (lowest) thresholds
+    order = np.lexsort((-sweep["f1"].ravel(), -values))[:top]
+    axes = [sweep["grid"][k] for k in ("min_inner_on_ratio", "strong_inner_on_ratio",
+                                       "edge_density_thr", "min_vote_score")]
+    ranked = []
+    for flat in order:
+        if values[flat] < 0:
+            break
+        idx = np.unravel_index(flat, sweep["f1"].shape)
+        setting = {name: float(ax[i]) for name, ax, i in zip(
+            ("min_inner_on_ratio", "strong_inner_on_ratio", "edge_density_thr", "min_vote_score"), axes, idx)}
+        setting.update({m: round(float(sweep[m][idx]), 4) for m in ("precision", "recall", "f1")})
+        setting.update({m: int(sweep[m][idx]) for m in ("tp", "fp", "fn")})
+        ranked.append(setting)
+    return ranked
+
+
+def evaluate_config(inner, edge, valid, truth, cfg: ExamConfig) -> dict:
+    """Precision/recall of the thresholds currently in `cfg` (baseline for the report)."""
+    grid = {k: [getattr(cfg, k)] for k in THRESHOLDS}
+    sweep = threshold_sweep(inner, edge, valid, truth, grid)
+    return best_setting(sweep, top=1)[0]
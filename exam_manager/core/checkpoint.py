@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+
+from exam_manager.ui.exam_config import ExamConfig
+
+
+# Settings that do not change grades; editing them must not invalidate a checkpoint
+NON_GRADING_KEYS = {
+    "debug_cv", "debug_dump_n", "save_page_images", "trace_stages", "trace_export",
+    "log_level", "log_json", "startup_budget_ms", "yolo_warmup", "yolo_batch_size", "yolo_threads",
+    "page_queue_size", "save_visualizations", "vis_format", "vis_max_width", "vis_quality",
+    "review_cache_mb", "review_prefetch", "debug_sample", "debug_sample_rate", "debug_near_margin",
+    "debug_max_samples", "debug_buffer_size", "service_host", "service_port", "service_socket",
+    "service_workers", "service_max_queue", "service_keep_jobs", "service_upload_dir",
+}
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def config_fingerprint(cfg: ExamConfig) -> str:
+    """
+    Hash of every grading-relevant setting plus the identity (size, mtime) of the
+    YOLO weights, so retraining the model also invalidates old results.
+    """
+    data = {k: v for k, v in sorted(cfg.__dict__.items()) if k not in NON_GRADING_KEYS}
+    if cfg.use_yolo_zone_detection and os.path.exists(cfg.yolo_model_path):
+        st = os.stat(cfg.yolo_model_path)
+        data["_yolo_weights"] = (st.st_size, st.st_mtime_ns)
+    blob = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class BatchCheckpoint:
+    """
+    Append-only JSON-lines log of graded PDFs, keyed by absolute path and
+    identified by content hash + config fingerprint. A line is flushed as soon
+    as a file finishes, so an interrupted run resumes after the last completed
+    file. The hash is only recomputed when a file's size or mtime changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries = {}
+        self._hashed_stat = {}
+        n_lines = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    n_lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # torn last line of a killed run
+                        continue
+                    self._entries[entry["pdf"]] = entry
+        if n_lines > 2 * len(self._entries) + 16:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with only the latest entry per PDF."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def content_hash(self, pdf_path: str) -> str:
+        st = os.stat(pdf_path)
+        # remember the stat the hash belongs to, mark() stores it with the entry
+        self._hashed_stat[pdf_path] = (st.st_size, st.st_mtime_ns)
+        entry = self._entries.get(pdf_path)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return entry["sha256"]
+        return file_sha256(pdf_path)
+
+    def is_done(self, pdf_path: str, sha256: str, fingerprint: str) -> bool:
+        """True when pdf_path was graded successfully with the same content and config."""
+        entry = self._entries.get(pdf_path)
+        if entry is None or entry.get("status") != "ok" or entry.get("config") != fingerprint:
+            return False
+        if not os.path.exists(entry["record"].get("output") or ""):
+            return False
+        return sha256 == entry["sha256"]
+
+    def record_for(self, pdf_path: str) -> dict:
+        return dict(self._entries[pdf_path]["record"])
+
+    def mark(self, pdf_path: str, sha256: str, fingerprint: str, record: dict):
+        """`sha256` is the hash taken before grading, so a file edited meanwhile is redone next time."""
+        size, mtime_ns = self._hashed_stat.get(pdf_path, (None, None))
+        entry = {
+            "pdf": pdf_path,
+            "sha256": sha256,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "config": fingerprint,
+            "status": record["status"],
+            "record": record,
+        }
+        self._entries[pdf_path] = entry
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
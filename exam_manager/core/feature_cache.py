@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+import numpy as np
+
+from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.utils.detection_pipline_processes import apply_checkbox_features
+from exam_manager.core.grading_system import grade_exam, validate_detection_results
+
+
+# Settings the cached features depend on; changing them needs a full re-run
+FEATURE_SETTINGS = (
+    "raster_dpi", "enable_deskew", "use_yolo_zone_detection", "yolo_model_path", "yolo_confidence",
+    "yolo_backend", "yolo_int8", "yolo_imgsz",
+    "zone_expansion_factor", "multi_zone", "max_zones_per_page", "zone_overlap_iou",
+    "options_per_question", "inner_crop_pct", "use_adaptive_threshold",
+)
+
+_INT_FIELDS = ("question", "option", "x", "y", "w", "h")
+_FLOAT_FIELDS = ("inner_ratio", "edge_ratio")
+
+
+def features_path(pdf_path: str) -> str:
+    return os.path.splitext(pdf_path)[0] + "_features.npz"
+
+
+def save_features(path: str, page_features: list, student: dict, page_info: list, cfg: ExamConfig):
+    """
+    Write the per-checkbox features of one PDF as a compressed npz.
+    `page_features` is [(page_no, features dict filled by process_checkbox_rows), ...];
+    box geometry is stored in page coordinates.
+    """
+    cols = {name: [] for name in ("page", *_INT_FIELDS, *_FLOAT_FIELDS, "valid")}
+    zones = []
+    for page_no, feat in page_features:
+        n = len(feat.get("question", []))
+        if n == 0:
+            continue
+        zx, zy = feat["zone"][0], feat["zone"][1]
+        zones.append((page_no, *feat["zone"]))
+        cols["page"].append(np.full(n, page_no))
+        for name in _INT_FIELDS + _FLOAT_FIELDS + ("valid",):
+            values = np.asarray(feat[name])
+            if name == "x":
+                values = values + zx
+            elif name == "y":
+                values = values + zy
+            cols[name].append(values)
+
+    def column(name, dtype):
+        return np.concatenate(cols[name]).astype(dtype) if cols[name] else np.zeros(0, dtype)
+
+    # few wide members instead of one per field: npz loading cost is per member
+    arrays = {
+        "ints": np.stack([column(n, np.int32) for n in ("page", *_INT_FIELDS)], axis=1),
+        "ratios": np.stack([column(n, np.float64) for n in _FLOAT_FIELDS], axis=1),
+        "valid": column("valid", bool),
+        "zones": np.asarray(zones, dtype=np.int32).reshape(-1, 5),
+    }
+
+    meta = {
+        "student": student,
+        "pages": page_info,
+        "settings": {k: getattr(cfg, k) for k in FEATURE_SETTINGS},
+        "created": datetime.now().isoformat(timespec="seconds"),
+    }
+    arrays["meta"] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    np.savez_compressed(path, **arrays)
+
+
+def load_features(path: str) -> dict:
+    """Inverse of save_features: one array per field plus "zones" and "meta"."""
+    with np.load(path) as data:
+        ints, ratios = data["ints"], data["ratios"]
+        feats = {name: ints[:, i] for i, name in enumerate(("page", *_INT_FIELDS))}
+        feats.update({name: ratios[:, i] for i, name in enumerate(_FLOAT_FIELDS)})
+        feats["valid"] = data["valid"]
+        feats["zones"] = data["zones"]
+        feats["meta"] = json.loads(data["meta"].tobytes().decode("utf-8"))
+    return feats
+
+
+def regrade_from_features(path: str, cfg: ExamConfig) -> dict:
+    """
+    Rebuild the process_pdf summary of one PDF from its cached features with the
+    thresholds/labels of `cfg`: checkbox decisions, answer selection and grading only.
+    """
+    feats = load_features(path)
+    meta = feats["meta"]
+    changed = [k for k, v in meta["settings"].items() if hasattr(cfg, k) and getattr(cfg, k) != v]
+    if changed:
+        logging.warning(f"{os.path.basename(path)}: cached features were extracted with different "
+                        f"{', '.join(changed)}; run the full pipeline for exact results")
+
+    results = apply_checkbox_features(feats, cfg)
+    return {
+        "student": meta["student"],
+        "results": results,
+        "total_questions": len(results),
+        "pages": meta["pages"],
+        "validation": validate_detection_results(results),
+        "grading": grade_exam(results, cfg),
+        "visualizations": [],
+        "regraded_from": path,
+    }
+
+
+def regrade_pdfs(pdf_paths: list, cfg: ExamConfig, write_json: bool = True) -> dict:
+    """
+    Re-grade every PDF that has a <pdf>_features.npz. Returns {pdf_path: summary};
+    PDFs without cached features are left out (they need a full run).
+    """
+    summaries = {}
+    for pdf_path in pdf_paths:
+        path = features_path(pdf_path)
+        if not os.path.exists(path):
+            logging.warning(f"No cached features for {pdf_path}")
+            continue
+        summary = regrade_from_features(path, cfg)
+        if write_json:
+            with open(os.path.splitext(pdf_path)[0] + "_grades.json", "w", encoding="utf-8") as f:
+                f.write(json.dumps(summary, indent=2, ensure_ascii=False))
+        summaries[pdf_path] = summary
+    return summaries
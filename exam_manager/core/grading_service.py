@@ -0,0 +1,306 @@
+import json
+import logging
+import multiprocessing as mp
+import os
+import re
+import socketserver
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.core.batch_processing import _export_for_workers, _grade_one, _init_worker, _worker_ready
+
+
+# longest a client may block on ?wait=<seconds>
+MAX_WAIT_S = 600.0
+
+
+class ServiceBusy(Exception):
+    """Raised by GradingService.submit when cfg.service_max_queue jobs are already waiting."""
+
+
+def check_pages(pages) -> tuple | None:
+    """A submitted page range as (first, last); ValueError unless two ints with 1 <= first <= last."""
+    if not pages:
+        return None
+    if not (isinstance(pages, (list, tuple)) and len(pages) == 2
+            and all(isinstance(p, int) and not isinstance(p, bool) for p in pages)
+            and 1 <= pages[0] <= pages[1]):
+        raise ValueError(f"pages must be [first, last] with 1 <= first <= last, got {pages!r}")
+    return tuple(pages)
+
+
+class Job:
+    """One PDF (or page range) submitted to the service, with its future and result."""
+
+    def __init__(self, job_id: str, pdf_path: str, pages: tuple | None = None):
+        self.id = job_id
+        self.pdf_path = pdf_path
+        self.pages = pages
+        self.submitted = time.time()
+        self.finished = None
+        self.future = None
+        self.record = None
+        self.summary = None
+        self.done = threading.Event()
+
+    @property
+    def status(self) -> str:
+        if self.record is not None:
+            return {"ok": "done"}.get(self.record["status"], self.record["status"])
+        return "running" if self.future.running() else "queued"
+
+    def to_dict(self, with_summary: bool = False) -> dict:
+        out = {
+            "id": self.id,
+            "status": self.status,
+            "pdf": self.pdf_path,
+            "pages": list(self.pages) if self.pages else None,
+            "submitted": round(self.submitted, 3),
+            "elapsed_s": round((self.finished or time.time()) - self.submitted, 3),
+        }
+        if self.record is not None:
+            out.update({k: self.record[k] for k in ("error", "output", "pid") if k in self.record})
+            out["grading_s"] = self.record.get("elapsed_s")
+        if with_summary and self.summary is not None:
+            out["summary"] = self.summary
+        return out
+
+
+class GradingService:
+    """
+    Long-lived grading engine: a process pool whose workers load the YOLO detector
+    (and keep the ExamConfig) once, for the lifetime of the service, plus a job table
+    for status polling. Jobs are process_pdf calls; their summary is kept until
+    cfg.service_keep_jobs newer jobs have finished. With cfg.result_store_path every
+    result is also filed in the SQLite store, as one run per service lifetime.
+    """
+
+    def __init__(self, cfg: ExamConfig, key, workers: int | None = None):
+        self.cfg = cfg
+        self.workers = max(1, workers or cfg.service_workers or os.cpu_count() or 1)
+        self.upload_dir = cfg.service_upload_dir or os.path.join(tempfile.gettempdir(), "exam_manager_uploads")
+        self.started = time.time()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+        _export_for_workers(cfg)
+        # spawn: torch/ultralytics are not fork-safe once initialised
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("spawn"),
+                                         initializer=_init_worker, initargs=(cfg, key))
+
+        self.store = self.run_id = None
+        if cfg.result_store_path:
+            from exam_manager.core.result_store import ResultStore, exam_name
+            self.store = ResultStore(cfg.result_store_path)
+            self.run_id = self.store.start_run(exam_name(cfg), cfg, source="service")
+
+    def warm(self) -> list:
+        """
+        Start the workers now rather than on the first job: one no-op task per worker.
+        Each process warms its detector in _init_worker, so it does not matter which
+        process runs which task. Returns the pids that answered (a worker that starts
+        after the others have drained the tasks is still warmed before its first job).
+        """
+        t0 = time.perf_counter()
+        pids = sorted(set(self._pool.map(_worker_ready, range(self.workers))))
+        logging.info(f"{len(pids)} of {self.workers} grading worker(s) ready in {time.perf_counter() - t0:.1f}s")
+        return pids
+
+    # ---------- jobs ----------
+    def submit(self, pdf_path: str, pages: tuple | None = None) -> Job:
+        """Queue one PDF, or the page range pages=(first, last) of it (1-based, inclusive)."""
+        pages = check_pages(pages)
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        with self._lock:
+            if sum(1 for j in self._jobs.values() if j.record is None) >= self.cfg.service_max_queue:
+                raise ServiceBusy(f"{self.cfg.service_max_queue} jobs already waiting")
+            job = Job(uuid.uuid4().hex[:12], os.path.abspath(pdf_path), pages)
+            job.future = self._pool.submit(_grade_one, job.pdf_path, job.pages, True)
+            self._jobs[job.id] = job
+        job.future.add_done_callback(lambda fut, job=job: self._finished(job, fut))
+        return job
+
+    def save_upload(self, data: bytes, filename: str = "") -> str:
+        """Write an uploaded PDF to the upload folder; its outputs are written next to it."""
+        if not data.startswith(b"%PDF"):
+            raise ValueError("upload is not a PDF")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        stem = re.sub(r"[^\w.-]+", "_", os.path.splitext(os.path.basename(filename))[0])[:80] or "upload"
+        path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex[:8]}_{stem}.pdf")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _finished(self, job: Job, fut):
+        # runs on the executor's management thread
+        if fut.cancelled():
+            record = {"pdf": job.pdf_path, "status": "cancelled"}
+        else:
+            try:
+                record = fut.result()
+            except Exception as e:
+                # worker crashed (e.g. killed by OOM) before it could report
+                record = {"pdf": job.pdf_path, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+        summary = record.pop("summary", None)
+        if summary is not None and self.store is not None:
+            from exam_manager.core.result_store import exam_name
+            try:
+                self.store.save(record["pdf"], summary, exam_name(self.cfg), self.run_id)
+            except Exception as e:
+                logging.error(f"Result store: {record['pdf']} not saved ({e})")
+        if record["status"] == "failed":
+            logging.error(f"Job {job.id} ({job.pdf_path}): {record.get('error')}")
+        with self._lock:
+            job.record, job.summary, job.finished = record, summary, time.time()
+            self._evict()
+        job.done.set()
+
+    def _evict(self):
+        finished = [j.id for j in self._jobs.values() if j.record is not None]
+        for job_id in finished[:max(0, len(finished) - self.cfg.service_keep_jobs)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        job = self.get(job_id)
+        return job is not None and job.future.cancel()
+
+    def stats(self) -> dict:
+        counts = {}
+        for job in self.jobs():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"status": "ok", "workers": self.workers, "uptime_s": round(time.time() - self.started, 1),
+                "jobs": counts}
+
+    def close(self):
+        """Cancel the waiting jobs, let the running ones finish, stop the workers."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if self.store is not None:
+            self.store.finish_run(self.run_id)
+            self.store.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    JSON API of the grading service:
+      GET    /health            workers, uptime, job counts
+      GET    /jobs              every known job (without summaries)
+      POST   /jobs              {"pdf": path, "pages": [first, last]} or a raw application/pdf upload
+      GET    /jobs/<id>         status, plus the process_pdf summary once done
+      DELETE /jobs/<id>         cancel a job that has not started
+    POST and GET /jobs/<id> accept ?wait=<seconds> to block until the job is finished.
+    "pages" (or ?pages=first-last for uploads) grades a page range, e.g. one copy of a class scan.
+    """
+
+    server_version = "ExamManager"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> GradingService:
+        return self.server.service
+
+    def _send(self, code: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+        return parts, query
+
+    def _wait(self, job: Job, query: dict):
+        if "wait" in query:
+            try:
+                timeout = min(float(query["wait"] or MAX_WAIT_S), MAX_WAIT_S)
+            except ValueError:
+                timeout = 0.0
+            job.done.wait(timeout)
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts == ["health"]:
+            return self._send(200, self.service.stats())
+        if parts == ["jobs"]:
+            return self._send(200, {"jobs": [j.to_dict() for j in self.service.jobs()]})
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                return self._send(404, {"error": f"unknown job {parts[1]}"})
+            self._wait(job, query)
+            return self._send(200, job.to_dict(with_summary=True))
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        parts, query = self._route()
+        if parts != ["jobs"]:
+            return self._send(404, {"error": "not found"})
+        data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/pdf"):
+                # checked before the upload is written, so a bad range leaves nothing behind
+                pages = check_pages([int(p) for p in query["pages"].split("-")] if query.get("pages") else None)
+                pdf_path = self.service.save_upload(data, query.get("name", ""))
+            else:
+                request = json.loads(data or b"{}")
+                pdf_path, pages = request["pdf"], request.get("pages")
+            job = self.service.submit(pdf_path, pages)
+        except ServiceBusy as e:
+            return self._send(503, {"error": str(e)})
+        except (KeyError, ValueError, TypeError, FileNotFoundError) as e:
+            return self._send(400, {"error": f"{type(e).__name__}: {e}"})
+        self._wait(job, query)
+        self._send(200 if job.done.is_set() else 202, job.to_dict(with_summary=True))
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send(404, {"error": "not found"})
+        if self.service.get(parts[1]) is None:
+            return self._send(404, {"error": f"unknown job {parts[1]}"})
+        cancelled = self.service.cancel(parts[1])
+        self._send(200 if cancelled else 409, {"id": parts[1], "cancelled": cancelled})
+
+    def log_message(self, fmt, *args):
+        logging.debug(f"{self.address_string()} {fmt % args}")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def make_server(service: GradingService, host: str = "127.0.0.1", port: int = 8765, socket_path: str = ""):
+    """HTTP server for `service` on host:port, or on the Unix socket `socket_path` when given."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # stale socket of a previous run
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    server.service = service
+    return server
@@ -1,3 +1,5 @@
+import logging
+
 from exam_manager.ui.exam_config import ExamConfig   
 
 def validate_detection_results(results: list) -> dict:
@@ -41,7 +43,7 @@ def grade_exam(results: list, cfg: ExamConfig) -> dict:
         labels[i]: (len(labels) - 1 - i) / (len(labels) - 1)
         for i in range(len(labels))
     }
-    print(f"[DEBUG] Grading scale: {grading_scale}")
+    logging.debug(f"Grading scale: {grading_scale}")
 
     for r in results:
         grade = r.get("grade")
@@ -49,7 +51,7 @@ def grade_exam(results: list, cfg: ExamConfig) -> dict:
             continue
         frac = grading_scale.get(grade, 0.0)
         score += frac * points_per_q
-        print(f"[DEBUG] Q{r['question']}: grade={grade}, frac={frac:.2f}, contrib={frac * points_per_q:.2f}")
+        logging.debug(f"Q{r['question']}: grade={grade}, frac={frac:.2f}, contrib={frac * points_per_q:.2f}")
 
     percentage = round(score, 2)
     if percentage >= 90: letter = "A"
@@ -59,5 +61,5 @@ def grade_exam(results: list, cfg: ExamConfig) -> dict:
     elif percentage >= 50: letter = "E"
     else: letter = "F"
 
-    print(f"[DEBUG] Final Score: {percentage}, Letter: {letter}")
+    logging.debug(f"Final score: {percentage}, letter: {letter}")
     return {"score": percentage, "letter": letter}
@@ -0,0 +1,127 @@
+import logging
+import cv2
+import numpy as np
+
+from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.utils.helpers import to_gray
+
+
+class LayoutCache:
+    """
+    Remembers the grading zone and checkbox grid of each (template, page) once it
+    has been detected confidently. Later copies of the same page are registered
+    against the stored reference with phase correlation and scored at the cached
+    cells, so YOLO and the contour search only run for the first copy.
+    """
+
+    def __init__(self, thumb_width: int = 400, min_response: float = 0.2, max_shift: float = 0.05):
+        self.thumb_width = thumb_width
+        self.min_response = min_response   # phase-correlation peak needed to trust the alignment
+        self.max_shift = max_shift         # max accepted shift, as a fraction of the page size
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, cfg: ExamConfig):
+        return cls(min_response=cfg.layout_min_response, max_shift=cfg.layout_max_shift)
+
+    @staticmethod
+    def make_key(cfg: ExamConfig, n_pages: int, page_index: int) -> tuple:
+        return (cfg.layout_template or "default", n_pages, page_index)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def _thumbnail(self, page: np.ndarray) -> tuple[np.ndarray, float]:
+        gray = to_gray(page)
+        h, w = gray.shape[:2]
+        scale = min(1.0, self.thumb_width / float(w))
+        if scale < 1.0:
+            gray = cv2.resize(gray, (self.thumb_width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        return gray.astype(np.float32), scale
+
+    def store(self, key, page: np.ndarray, zone_coords: tuple, rows: list):
+        """
+        Cache the zone (page coords) and rows (zone coords) detected on `page`.
+        """
+        self.store_zones(key, page, [(zone_coords, rows)])
+
+    def store_zones(self, key, page: np.ndarray, zones: list):
+        """Multi-zone variant of store: [(zone_coords, rows), ...] in reading order."""
+        thumb, scale = self._thumbnail(page)
+        self._entries[key] = {
+            "shape": page.shape[:2],
+            "thumb": thumb,
+            "scale": scale,
+            # keep the grids in page coordinates so they can be shifted as a whole
+            "zones": [(tuple(int(v) for v in zone_coords),
+                       [[(x + zone_coords[0], y + zone_coords[1], w, h) for (x, y, w, h) in row] for row in rows])
+                      for zone_coords, rows in zones],
+        }
+
+    def lookup(self, key, page: np.ndarray):
+        """
+        Align `page` with the cached reference for `key`.
+        Returns (zone_image, zone_coords, rows) with rows in zone coordinates,
+        or None when there is no entry or the alignment is not trustworthy.
+        Entries stored with several zones are returned by lookup_zones only.
+        """
+        zones = self.lookup_zones(key, page)
+        if zones is None or len(zones) != 1:
+            return None
+        return zones[0]
+
+    def lookup_zones(self, key, page: np.ndarray):
+        """
+        Multi-zone variant of lookup: [(zone_image, zone_coords, rows), ...] in the
+        order they were stored, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None or page.shape[:2] != entry["shape"]:
+            self.misses += 1
+            return None
+
+        thumb, _ = self._thumbnail(page)
+        if thumb.shape != entry["thumb"].shape:
+            self.misses += 1
+            return None
+
+        window = cv2.createHanningWindow(thumb.shape[::-1], cv2.CV_32F)
+        (dx, dy), response = cv2.phaseCorrelate(entry["thumb"], thumb, window)
+        dx, dy = dx / entry["scale"], dy / entry["scale"]
+        img_h, img_w = entry["shape"]
+        if response < self.min_response or abs(dx) > self.max_shift * img_w or abs(dy) > self.max_shift * img_h:
+            logging.info(f"Layout cache: alignment rejected for {key} "
+                         f"(response={response:.2f}, shift=({dx:.1f}, {dy:.1f}))")
+            self.misses += 1
+            return None
+
+        dx, dy = int(round(dx)), int(round(dy))
+        found = []
+        for (x, y, w, h), page_rows in entry["zones"]:
+            x0, y0 = max(0, x + dx), max(0, y + dy)
+            x1, y1 = min(img_w, x + dx + w), min(img_h, y + dy + h)
+            if x1 <= x0 or y1 <= y0:
+                self.misses += 1
+                return None
+
+            rows = [[(bx + dx - x0, by + dy - y0, bw, bh) for (bx, by, bw, bh) in row] for row in page_rows]
+            for row in rows:
+                for (bx, by, bw, bh) in row:
+                    if bx < 0 or by < 0 or bx + bw > x1 - x0 or by + bh > y1 - y0:
+                        # a cell slid out of the page, let full detection handle it
+                        self.misses += 1
+                        return None
+            found.append((page[y0:y1, x0:x1], (x0, y0, x1 - x0, y1 - y0), rows))
+
+        self.hits += 1
+        logging.info(f"Layout cache hit for {key} (response={response:.2f}, shift=({dx}, {dy}))")
+        return found
@@ -2,26 +2,91 @@ import os
 import cv2
 import numpy as np
 import logging
-from ultralytics import YOLO
+import threading
+import time
 
 from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.utils.helpers import to_bgr
+from exam_manager.utils.tracing import span
+from exam_manager.core.zone_backends import load_zone_model
 
 
 
 class YOLOZoneDetector:
-    def __init__(self, model_path: str, confidence: float = 0.5):
+    def __init__(self, model_path: str, confidence: float = 0.5, lazy: bool = False,
+                 backend: str = "torch", int8: bool = False, threads: int = 0, imgsz: int = 640):
+        """
+        lazy=True defers importing ultralytics/torch and reading the weights until
+        load() is called (or the detector is first used), e.g. from a background thread.
+        backend: "torch" (ultralytics) or "onnx"/"openvino" on the exported weights,
+        optionally int8-quantized, with `threads` intra-op threads (0 = library default).
+        """
         self.model = None
+        self.model_path = model_path
         self.confidence = confidence
+        self.backend = backend
+        self.int8 = int8
+        self.threads = threads
+        self.imgsz = imgsz
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        if not lazy:
+            self.load()
+
+    @classmethod
+    def from_config(cls, cfg: ExamConfig, lazy: bool = False, threads: int | None = None):
+        return cls(cfg.yolo_model_path, cfg.yolo_confidence, lazy=lazy, backend=cfg.yolo_backend,
+                   int8=cfg.yolo_int8, threads=cfg.yolo_threads if threads is None else threads,
+                   imgsz=cfg.yolo_imgsz)
+
+    def load(self, warmup: bool = False) -> bool:
+        """
+        Import ultralytics and load the weights (once, thread-safe; concurrent
+        callers wait for the first one). warmup=True also runs one dummy inference
+        so the first real page does not pay for lazy CUDA/torch initialisation.
+        """
+        with self._load_lock:
+            if not self._loaded:
+                t0 = time.perf_counter()
+                try:
+                    if os.path.exists(self.model_path):
+                        self.model = self._load_model()
+                        logging.info(f"YOLO zone detection model loaded from {self.model_path} "
+                                     f"({self.backend}{' int8' if self.int8 and self.backend != 'torch' else ''}) "
+                                     f"in {time.perf_counter() - t0:.2f}s")
+                    else:
+                        logging.warning(f"YOLO model not found at {self.model_path}")
+                except Exception as e:
+                    logging.error(f"Failed to load YOLO model: {e}")
+                self._loaded = True
+            if warmup and self.model is not None:
+                self.warmup()
+        return self.model is not None
+
+    def _load_model(self):
+        if self.backend != "torch":
+            try:
+                return load_zone_model(self.model_path, self.backend, self.imgsz, self.int8, self.threads)
+            except Exception as e:
+                # missing onnxruntime/openvino or a failed export: the weights still work with torch
+                logging.error(f"YOLO {self.backend} backend unavailable ({e}), falling back to torch")
+        return load_zone_model(self.model_path, "torch")
+
+    def warmup(self, size: int = 640):
+        t0 = time.perf_counter()
         try:
-            if os.path.exists(model_path):
-                self.model = YOLO(model_path)
-                print(f"YOLO zone detection model loaded from {model_path}")
-            else:
-                logging.warning(f"YOLO model not found at {model_path}")
+            self.model(np.full((size, size, 3), 255, dtype=np.uint8), conf=self.confidence, verbose=False)
+            logging.info(f"YOLO warm-up done in {time.perf_counter() - t0:.2f}s")
         except Exception as e:
-            logging.error(f"Failed to load YOLO model: {e}")
-            
+            logging.warning(f"YOLO warm-up failed: {e}")
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
     def is_available(self) -> bool:
+        # blocks until a background load() has finished
+        if not self._loaded:
+            self.load()
         return self.model is not None
     
     def detect_grading_zone(self, page_image: np.ndarray, cfg: ExamConfig) -> tuple:
@@ -34,49 +99,158 @@ class YOLOZoneDetector:
             return None, None
             
         try:
-            results = self.model(page_image, conf=self.confidence)
-            
-            best_detection = None
-            best_confidence = 0
+            # the model was trained on colour scans, grayscale pages get replicated channels
+            with span("yolo"):
+                results = self.model(to_bgr(page_image), conf=self.confidence, verbose=False)
+            best_detection = self._best_box(results[0]) if results else None
+            return self._crop_zone(page_image, best_detection, cfg)
             
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        conf = float(box.conf[0].cpu().numpy())
-                        if conf > best_confidence:
-                            best_confidence = conf
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            best_detection = (int(x1), int(y1), int(x2-x1), int(y2-y1), conf)
-                            print(best_detection)
-            
-            if best_detection is None:
-                logging.warning("No grading zone detected by YOLO")
-                return None, None
-            
-            x, y, w, h, conf = best_detection
-            
-            # Expand the detected zone slightly to ensure we don't miss edges
-            expand = cfg.zone_expansion_factor
-            img_h, img_w = page_image.shape[:2]
-            
-            x_exp = max(0, int(x - w * expand))
-            y_exp = max(0, int(y - h * expand))
-            w_exp = min(img_w - x_exp, int(w * (1 + 2 * expand)))
-            h_exp = min(img_h - y_exp, int(h * (1 + 2 * expand)))
-            
-            # Crop the zone from the original image
-            zone_image = page_image[y_exp:y_exp+h_exp, x_exp:x_exp+w_exp]
-            zone_coords = (x_exp, y_exp, w_exp, h_exp)
+        except Exception as e:
+            logging.error(f"YOLO zone detection failed: {e}")
+            return None, None
 
-            if zone_image is not None:
-                print(f"[DEBUG] Zone crop shape: {zone_image.shape}, coords={zone_coords}")
+    def detect_grading_zones(self, page_image: np.ndarray, cfg: ExamConfig) -> list:
+        """
+        Detect every grading zone of the page (e.g. both columns of a two-column sheet)
+        Returns [(zone_image, zone_coords), ...] in reading order, [] if detection fails
+        """
+        if not self.is_available():
+            return []
+
+        try:
+            with span("yolo"):
+                results = self.model(to_bgr(page_image), conf=self.confidence, verbose=False)
+            boxes = self._all_boxes(results[0], cfg) if results else []
+            return [self._crop_zone(page_image, box, cfg) for box in boxes]
 
-            
-            logging.info(f"Grading zone detected with confidence {conf:.2f} at ({x_exp}, {y_exp}, {w_exp}, {h_exp})")
-            return zone_image, zone_coords
-            
         except Exception as e:
             logging.error(f"YOLO zone detection failed: {e}")
+            return []
+
+    def detect_grading_zones_batch(self, pages: list, cfg: ExamConfig, batch_size: int | None = None) -> list:
+        """
+        Batched variant of detect_grading_zone: runs the pages through the model
+        `batch_size` at a time (cfg.yolo_batch_size by default).
+        Returns one (zone_image, zone_coords) tuple per page, (None, None) where detection failed.
+        """
+        return self._detect_batch(pages, cfg, batch_size, all_zones=False)
+
+    def detect_all_zones_batch(self, pages: list, cfg: ExamConfig, batch_size: int | None = None) -> list:
+        """Batched variant of detect_grading_zones: one list of zones per page ([] where detection failed)."""
+        return self._detect_batch(pages, cfg, batch_size, all_zones=True)
+
+    def _detect_batch(self, pages: list, cfg: ExamConfig, batch_size: int | None, all_zones: bool) -> list:
+        empty = [] if all_zones else (None, None)
+        zones = [empty] * len(pages)
+        if not self.is_available() or not pages:
+            return zones
+
+        batch_size = max(1, batch_size or cfg.yolo_batch_size)
+        for start in range(0, len(pages), batch_size):
+            chunk = pages[start:start + batch_size]
+            try:
+                results = self.model([to_bgr(p) for p in chunk], conf=self.confidence, verbose=False)
+            except Exception as e:
+                logging.error(f"YOLO batch zone detection failed for pages {start + 1}-{start + len(chunk)}: {e}")
+                continue
+            for i, (page, result) in enumerate(zip(chunk, results)):
+                if all_zones:
+                    zones[start + i] = [self._crop_zone(page, box, cfg) for box in self._all_boxes(result, cfg)]
+                else:
+                    zones[start + i] = self._crop_zone(page, self._best_box(result), cfg)
+        return zones
+
+    @staticmethod
+    def _best_box(result):
+        """
+        Pick the highest-confidence box of one result with tensor ops
+        (single device→host copy instead of one per box).
+        Returns (x, y, w, h, conf) or None.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return None
+        best = int(boxes.conf.argmax())
+        x1, y1, x2, y2 = boxes.xyxy[best].tolist()
+        return int(x1), int(y1), int(x2 - x1), int(y2 - y1), float(boxes.conf[best])
+
+    @staticmethod
+    def _all_boxes(result, cfg: ExamConfig) -> list:
+        """
+        Every box of one result as (x, y, w, h, conf), in reading order.
+        Boxes overlapping a more confident one by more than cfg.zone_overlap_iou are
+        duplicates of the same zone; at most cfg.max_zones_per_page are kept.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return []
+        xyxy = np.asarray(boxes.xyxy.tolist(), dtype=np.float64).reshape(-1, 4)
+        conf = np.asarray(boxes.conf.tolist(), dtype=np.float64).reshape(-1)
+
+        kept = []
+        for i in np.argsort(-conf, kind="stable"):
+            if len(kept) >= cfg.max_zones_per_page:
+                break
+            if kept and _iou(xyxy[i], xyxy[kept]).max() > cfg.zone_overlap_iou:
+                continue
+            kept.append(int(i))
+
+        found = [(int(x1), int(y1), int(x2 - x1), int(y2 - y1), float(conf[i]))
+                 for i in kept for x1, y1, x2, y2 in [xyxy[i]]]
+        return _reading_order(found)
+
+    @staticmethod
+    def _crop_zone(page_image: np.ndarray, detection, cfg: ExamConfig) -> tuple:
+        if detection is None:
+            logging.warning("No grading zone detected by YOLO")
             return None, None
+
+        x, y, w, h, conf = detection
+
+        # Expand the detected zone slightly to ensure we don't miss edges
+        expand = cfg.zone_expansion_factor
+        img_h, img_w = page_image.shape[:2]
+
+        x_exp = max(0, int(x - w * expand))
+        y_exp = max(0, int(y - h * expand))
+        w_exp = min(img_w - x_exp, int(w * (1 + 2 * expand)))
+        h_exp = min(img_h - y_exp, int(h * (1 + 2 * expand)))
+
+        # Crop the zone from the original image
+        zone_image = page_image[y_exp:y_exp+h_exp, x_exp:x_exp+w_exp]
+        zone_coords = (x_exp, y_exp, w_exp, h_exp)
+
+        logging.info(f"Grading zone detected with confidence {conf:.2f} at ({x_exp}, {y_exp}, {w_exp}, {h_exp})")
+        return zone_image, zone_coords
         
+
+
+def _iou(box: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """IoU of one xyxy box against an (N, 4) array of xyxy boxes."""
+    ix = np.clip(np.minimum(box[2], others[:, 2]) - np.maximum(box[0], others[:, 0]), 0, None)
+    iy = np.clip(np.minimum(box[3], others[:, 3]) - np.maximum(box[1], others[:, 1]), 0, None)
+    inter = ix * iy
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (others[:, 2] - others[:, 0]) * (others[:, 3] - others[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def _reading_order(boxes: list) -> list:
+    """
+    Sort (x, y, w, h, ...) boxes column by column: boxes sharing more than half of
+    the narrower width horizontally belong to the same column; columns go left to
+    right and boxes top to bottom inside a column.
+    """
+    columns = []  # [x_min, x_max, [boxes]]
+    for box in sorted(boxes, key=lambda b: b[0]):
+        x, w = box[0], box[2]
+        for col in columns:
+            overlap = min(x + w, col[1]) - max(x, col[0])
+            if overlap > 0.5 * min(w, col[1] - col[0]):
+                col[0], col[1] = min(col[0], x), max(col[1], x + w)
+                col[2].append(box)
+                break
+        else:
+            columns.append([x, x + w, [box]])
+    columns.sort(key=lambda c: c[0])
+    return [box for col in columns for box in sorted(col[2], key=lambda b: b[1])]
@@ -1,33 +1,81 @@
+import contextvars
 import cv2
 import numpy as np
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from exam_manager.ui.exam_config import ExamConfig
 from exam_manager.utils.deskew_image import deskew_image
 from exam_manager.core.main_yolo import YOLOZoneDetector
+from exam_manager.core.layout_cache import LayoutCache
 from exam_manager.utils.detection_pipline_processes import (
     find_shapes_in_zone, group_shapes_into_questions, process_checkbox_rows
 )
 from exam_manager.core.grading_system import validate_detection_results
+from exam_manager.utils.tracing import span
 
 def process_exam_page_with_zone_detection(page_bgr: np.ndarray, cfg: ExamConfig, 
                                         zone_detector: YOLOZoneDetector, 
-                                        q_start_index: int = 1):
+                                        q_start_index: int = 1,
+                                        detected_zone: tuple | None = None,
+                                        deskewed: bool = False,
+                                        layout_cache: LayoutCache | None = None,
+                                        layout_key: tuple | None = None,
+                                        features_out: dict | None = None,
+                                        detected_zones: list | None = None):
     """
     Process exam page using YOLO to detect grading zone, then OpenCV for checkboxes
+    - detected_zone: (zone_image, zone_coords) already found by the caller (batched YOLO)
+    - deskewed: the caller already deskewed the page
+    - layout_cache/layout_key: reuse the zone + checkbox grid of an earlier copy of this
+      page when it can be aligned, and remember this page's layout otherwise
+    - features_out: filled with the per-checkbox features (see process_checkbox_rows)
+      plus the zone coordinates under "zone"
+    - detected_zones: every zone of the page already found by the caller (cfg.multi_zone)
     """
     
-    if cfg.enable_deskew:
-        page_bgr = deskew_image(page_bgr)
+    if cfg.enable_deskew and not deskewed:
+        with span("deskew"):
+            page_bgr = deskew_image(page_bgr, cfg)
     
     try:
         zone_image = None
         zone_coords = None
         processing_area = page_bgr  # Default to full page
+
+        # Cached layout: align and score at the known cells
+        if layout_cache is not None and layout_key is not None and detected_zone is None and not detected_zones:
+            with span("layout_lookup"):
+                cached = layout_cache.lookup_zones(layout_key, page_bgr)
+            if cached is not None and len(cached) > 1:
+                results, page_bgr, validation = _process_zones(
+                    page_bgr, [(img, coords) for img, coords, _ in cached], cfg, q_start_index,
+                    None, None, features_out, zone_rows=[rows for _, _, rows in cached])
+                validation["layout_cache"] = "hit"
+                return results, page_bgr, validation
+            if cached is not None:
+                zone_image, zone_coords, rows = cached[0]
+                if features_out is not None:
+                    features_out["zone"] = zone_coords
+                with span("scoring"):
+                    results = process_checkbox_rows(rows, zone_image, cfg, q_start_index, features_out)
+                validation = validate_detection_results(results)
+                validation["layout_cache"] = "hit"
+                return results, page_bgr, validation
         
         # Try YOLO zone detection first
         if cfg.use_yolo_zone_detection and zone_detector.is_available():
-            zone_image, zone_coords = zone_detector.detect_grading_zone(page_bgr, cfg)
+            if cfg.multi_zone:
+                zones = detected_zones
+                if zones is None:
+                    zones = zone_detector.detect_grading_zones(page_bgr, cfg)
+                if len(zones) > 1:
+                    return _process_zones(page_bgr, zones, cfg, q_start_index, layout_cache, layout_key, features_out)
+                zone_image, zone_coords = zones[0] if zones else (None, None)
+            elif detected_zone is not None:
+                zone_image, zone_coords = detected_zone
+            else:
+                zone_image, zone_coords = zone_detector.detect_grading_zone(page_bgr, cfg)
 
             if zone_image is not None and zone_coords is not None:
                 processing_area = zone_image
@@ -37,21 +85,89 @@ def process_exam_page_with_zone_detection(page_bgr: np.ndarray, cfg: ExamConfig,
                 return [], page_bgr, {"warning": "Page skipped (no zone detected)"}
                 
         # Process checkboxes in the detected/selected area
-        candidates = find_shapes_in_zone(processing_area, cfg)
+        with span("contours"):
+            candidates = find_shapes_in_zone(processing_area, cfg)
+            rows = group_shapes_into_questions(candidates, cfg)
         if not candidates:
             return [], page_bgr, {"error": "No checkbox candidates found in processing area"}
-
-        rows = group_shapes_into_questions(candidates, cfg)
         if not rows:
             return [], page_bgr, {"error": "No valid checkbox rows detected"}
 
         # Process detected checkboxes
-        results = process_checkbox_rows(rows, processing_area, cfg, q_start_index)
+        if features_out is not None:
+            features_out["zone"] = zone_coords if zone_coords is not None else (0, 0, *page_bgr.shape[1::-1])
+        with span("scoring"):
+            results = process_checkbox_rows(rows, processing_area, cfg, q_start_index, features_out)
         
         validation = validate_detection_results(results)
+
+        # only a clean detection is worth reusing for the other copies
+        if (layout_cache is not None and layout_key is not None and zone_coords is not None
+                and not validation["warnings"]
+                and all(len(r) == cfg.options_per_question for r in rows)):
+            layout_cache.store(layout_key, page_bgr, zone_coords, rows)
+
         return results, page_bgr, validation
 
     except Exception as e:
         logging.error(f"Page processing failed: {e}")
         return [], page_bgr, {"error": f"Processing failed: {str(e)}"}
 
+
+
+def _zone_rows(zone_image: np.ndarray, cfg: ExamConfig) -> list:
+    return group_shapes_into_questions(find_shapes_in_zone(zone_image, cfg), cfg)
+
+
+def _process_zones(page_bgr: np.ndarray, zones: list, cfg: ExamConfig, q_start_index: int,
+                   layout_cache: LayoutCache | None, layout_key: tuple | None, features_out: dict | None,
+                   zone_rows: list | None = None):
+    """
+    Checkbox stage for a page with several grading zones (in reading order).
+    Contours and scoring of the zones run in worker threads (OpenCV releases the GIL);
+    question numbers continue from one zone to the next.
+    zone_rows: the rows of every zone when already known (layout cache hit).
+    Features use the bounding box of all zones as their zone.
+    """
+    def submit(pool, fn, *args):
+        # each task gets a copy of the caller's context so trace spans land on the page
+        return pool.submit(contextvars.copy_context().run, fn, *args)
+
+    with ThreadPoolExecutor(max_workers=len(zones)) as pool:
+        if zone_rows is None:
+            with span("contours", zones=len(zones)):
+                zone_rows = [f.result() for f in [submit(pool, _zone_rows, img, cfg) for img, _ in zones]]
+        if not any(zone_rows):
+            return [], page_bgr, {"error": "No valid checkbox rows detected"}
+
+        starts = np.cumsum([q_start_index] + [len(rows) for rows in zone_rows[:-1]])
+        zone_features = [{} if features_out is not None else None for _ in zones]
+        with span("scoring", zones=len(zones)):
+            futures = [submit(pool, process_checkbox_rows, rows, img, cfg, int(q0), feats)
+                       for (img, _), rows, q0, feats in zip(zones, zone_rows, starts, zone_features) if rows]
+            results = [r for f in futures for r in f.result()]
+
+    validation = validate_detection_results(results)
+    validation["zones"] = len(zones)
+
+    x0 = min(c[0] for _, c in zones)
+    y0 = min(c[1] for _, c in zones)
+    x1 = max(c[0] + c[2] for _, c in zones)
+    y1 = max(c[1] + c[3] for _, c in zones)
+    if features_out is not None:
+        features_out["zone"] = (x0, y0, x1 - x0, y1 - y0)
+        features_out["zones"] = [coords for _, coords in zones]
+        for (_, (zx, zy, _, _)), feats in zip(zones, zone_features):
+            for name, values in (feats or {}).items():
+                if name == "x":
+                    values = [v + zx - x0 for v in values]
+                elif name == "y":
+                    values = [v + zy - y0 for v in values]
+                features_out.setdefault(name, []).extend(values)
+
+    if (layout_cache is not None and layout_key is not None
+            and not validation["warnings"]
+            and all(len(r) == cfg.options_per_question for rows in zone_rows for r in rows)):
+        layout_cache.store_zones(layout_key, page_bgr, [(coords, rows) for (_, coords), rows in zip(zones, zone_rows)])
+
+    return results, page_bgr, validation
@@ -1,90 +1,200 @@
 # exam_manager/processing/exam_processor.py
 
+import contextlib
+import contextvars
 import logging
 import os
+import queue
+import threading
+import time
 import cv2
 import json
 import numpy as np
-import zxingcpp
 from cryptography.fernet import Fernet
 
 from exam_manager.utils.helpers import crop_qr_region
 from exam_manager.core.page_yolo_pipline import process_exam_page_with_zone_detection
 from exam_manager.core.main_yolo import YOLOZoneDetector
+from exam_manager.core.layout_cache import LayoutCache
 from exam_manager.utils.deskew_image import deskew_image
 from exam_manager.core.grading_system import grade_exam, validate_detection_results
+from exam_manager.core.feature_cache import save_features, features_path
+from exam_manager.core.visualization import VisualizationWriter, vis_path
+from exam_manager.utils.tracing import Tracer, span, trace_attrs
+from exam_manager.utils.debug_capture import DebugCapture
 
 
-def decode_qr_from_first_page(page_bgr: np.ndarray, key: bytes) -> dict:
+def _zxing_read_qr(img: np.ndarray) -> str | None:
+    import zxingcpp  # imported on first decode, keeps GUI startup light
+    # Convert to RGB for ZXing (grayscale images are passed as-is)
+    rgb = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    data = zxingcpp.read_barcode(rgb, formats=zxingcpp.BarcodeFormat.QRCode)
+    if not data:
+        return None
+    if isinstance(data, (list, tuple)):
+        data = data[0]
+    return data.text
+
+
+def read_qr_text(page_bgr: np.ndarray, cfg=None, deskew: bool = True) -> tuple[str, str]:
     """
-    Extract and decode QR from the first page using static cropping + ZXing.
+    Find the QR text on a page, cheapest attempt first:
+      crop      → the configured QR rectangle as scanned
+      widened   → the same rectangle grown by cfg.qr_widen_margin on every side
+      full_page → the whole raw page
+      deskewed  → crop, then whole page, after deskew_image (includes the OCR orientation pass)
+    `deskew=False` skips the last (slow) tier, e.g. when most pages have no QR at all.
+    Returns (text, tier). Raises ValueError when every tier fails.
     """
-    # --- Step 1: Crop QR region
-    deskewed = deskew_image(page_bgr)
-    qr_crop = crop_qr_region(deskewed)
-
+    region = getattr(cfg, "qr_crop_region", None)
+    margin = getattr(cfg, "qr_widen_margin", 0.5)
 
-    # --- Step 2: Convert to grayscale for ZXing
-    rgb = cv2.cvtColor(qr_crop, cv2.COLOR_BGR2RGB)
+    def deskewed_attempt():
+        deskewed = deskew_image(page_bgr, cfg)
+        return _zxing_read_qr(crop_qr_region(deskewed, region)) or _zxing_read_qr(deskewed)
 
+    tiers = (
+        ("crop", lambda: _zxing_read_qr(crop_qr_region(page_bgr, region))),
+        ("widened", lambda: _zxing_read_qr(crop_qr_region(page_bgr, region, margin=margin))),
+        ("full_page", lambda: _zxing_read_qr(page_bgr)),
+        ("deskewed", deskewed_attempt),
+    )[:None if deskew else 3]
+    t0 = time.perf_counter()
+    for tier, attempt in tiers:
+        text = attempt()
+        if text:
+            logging.info(f"QR decoded via '{tier}' tier in {(time.perf_counter() - t0) * 1000:.1f} ms")
+            return text, tier
+    raise ValueError("QR decode failed with ZXing")
 
-    # --- Step 3: Decode
-    data = zxingcpp.read_barcode(rgb)
-    if not data:
-        raise ValueError("QR decode failed with ZXing")
 
-    if isinstance(data, (list, tuple)):
-        data = data[0]
+def decode_qr_from_first_page(page_bgr: np.ndarray, key: bytes, cfg=None, deskew: bool = True) -> dict:
+    """
+    Extract and decode QR from the first page: tiered ZXing decode (see read_qr_text),
+    then Fernet decryption. The returned dict records the tier that succeeded in "qr_tier".
+    """
+    # --- Step 1-3: Locate + decode
+    text, tier = read_qr_text(page_bgr, cfg, deskew=deskew)
 
-    print("DEBUG - Decoded text:", data.text)  
+    logging.debug(f"QR text: {text}")
 
     try:
-        payload = json.loads(data.text)
+        payload = json.loads(text)
     except json.JSONDecodeError:
         raise ValueError("Decoded QR is not valid JSON")
 
     # --- Step 4: Decrypt
     key = key[0]
-    print("Using decryption key:", key)
     f = Fernet(key)
     decrypted = {
         "name": f.decrypt(payload["enc_name"].encode()).decode(),
         "id": f.decrypt(payload["enc_id"].encode()).decode(),
         "class": payload.get("class", ""),
         "university": payload.get("university", ""),
+        "qr_tier": tier,
     }
-    print("Decrypted name:", f.decrypt(payload["enc_name"].encode()).decode())
-    print("Decrypted id:", f.decrypt(payload["enc_id"].encode()).decode())
-    print("Class:", payload.get("class", ""))
-    print("University:", payload.get("university", ""))
+    logging.debug(f"QR student: id={decrypted['id']} class={decrypted['class']} "
+                  f"university={decrypted['university']} tier={tier}")
     return decrypted
 
 
-def process_pdf(pdf_path: str, cfg, zone_detector, key: bytes) -> dict:
+class ProcessingCancelled(Exception):
+    """Raised by process_pdf when its should_cancel callback returns True."""
+
+
+def segment_path(pdf_path: str, pages: tuple | None = None) -> str:
+    """
+    Name a page range of a PDF is graded under: <pdf>_p<first>-<last>.pdf (never
+    created on disk). Its outputs (_grades.json, _features.npz, _pages/, ...) and
+    result store entry derive from it like those of a whole PDF.
+    """
+    if pages is None:
+        return pdf_path
+    return f"{os.path.splitext(pdf_path)[0]}_p{pages[0]}-{pages[1]}.pdf"
+
+
+def process_pdf(pdf_path: str, cfg, zone_detector, key: bytes, layout_cache=None,
+                progress=None, should_cancel=None, tracer=None, pages: tuple | None = None) -> dict:
     """
     Full pipeline: convert PDF → extract QR → detect checkboxes → grade.
     Returns a summary dict (to be saved or displayed by the UI).
+    Pass a LayoutCache shared across PDFs of the same exam to skip YOLO/contour
+    search on pages whose layout is already known.
+    `progress(page_no, n_pages, page_results)` is called after every page and
+    `should_cancel()` is polled between steps (ProcessingCancelled is raised).
+    With cfg.trace_stages, per-stage timings are added to the summary under "timings"
+    (and written to <pdf>_trace.json when cfg.trace_export is "json" or "chrome").
+    Pass `tracer` to collect the spans of several PDFs in one Tracer.
+    With cfg.debug_cv, sampled checkbox intermediates go to <pdf>_debug.npz ("debug_archive").
+    `pages=(first, last)` grades only that range (one student of a stacked class scan,
+    see core.stack_split), with its outputs named after segment_path(pdf_path, pages).
     """
-    from exam_manager.utils.pdf import convert_pdf_to_images  # lazy import to avoid circulars
+    if tracer is None and cfg.trace_stages:
+        tracer = Tracer()
+    out_path = segment_path(pdf_path, pages)
+    capture = DebugCapture.from_config(cfg, out_path)
+    with tracer.activate(pdf=os.path.basename(out_path)) if tracer else contextlib.nullcontext():
+        with capture.activate() if capture else contextlib.nullcontext():
+            summary = _process_pdf(pdf_path, cfg, zone_detector, key, layout_cache, progress, should_cancel,
+                                   pages, out_path)
+        if capture is not None and capture.written:
+            summary["debug_archive"] = capture.path
+        if pages is not None:
+            summary["source"] = {"pdf": pdf_path, "pages": list(pages)}
 
-    if not os.path.exists(pdf_path):
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        if tracer is not None:
+            summary["timings"] = tracer.summary()
+
+        out_json = os.path.splitext(out_path)[0] + "_grades.json"
+        with span("json_write"), open(out_json, "w", encoding="utf-8") as f:
+            f.write(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    # the exported trace also has the json_write span that the summary could not include
+    if tracer is not None and cfg.trace_export:
+        tracer.export(os.path.splitext(out_path)[0] + "_trace.json", cfg.trace_export)
+
+    return summary
 
-    image_paths = convert_pdf_to_images(pdf_path)
-    if not image_paths:
-        raise RuntimeError("Failed to convert PDF to images.")
 
-    # --- First page: QR
-    first_path = image_paths[0]
-    first_bgr = cv2.imread(first_path)
-    if first_bgr is None:
-        raise RuntimeError("Failed to read first page image.")
+# end-of-stream marker passed through the page queues
+_END = object()
 
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once `stop` is set (the consumer is gone)."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Blocking get that returns _END once `stop` is set."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _END
+
+
+def _start_stage(name: str, target, *args) -> threading.Thread:
+    # run in a copy of the caller's context so trace spans land in the active Tracer
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(target, *args),
+                              name=f"process_pdf-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _decode_student(first_bgr: np.ndarray, key, cfg) -> dict:
     try:
-        student = decode_qr_from_first_page(first_bgr, key)
-        print("Decoded student info:", student)
+        with span("qr", page=1):
+            return decode_qr_from_first_page(first_bgr, key, cfg)
     except Exception as e:
-        student = {
+        return {
             "name": "Unknown",
             "id": "0000",
             "class": "N/A",
@@ -92,41 +202,202 @@ def process_pdf(pdf_path: str, cfg, zone_detector, key: bytes) -> dict:
             "error": str(e)
         }
 
+
+def _render_stage(pdf_path: str, page_nos: range, cfg, grayscale: bool, out_q: queue.Queue, stop: threading.Event):
+    """Producer: render the pages one at a time into the bounded queue."""
+    from exam_manager.utils.pdf import render_pdf_page
+    try:
+        for i in page_nos:
+            if stop.is_set():
+                return
+            with span("rasterize", page=i):
+                page = render_pdf_page(pdf_path, i, dpi=cfg.raster_dpi, grayscale=grayscale)
+            if not _put(out_q, (i, page), stop):
+                return
+        _put(out_q, _END, stop)
+    except Exception as e:
+        _put(out_q, e, stop)
+
+
+def _prepare_stage(cfg, zone_detector, key, layout_cache, layout_keys: dict, student: dict,
+                   in_q: queue.Queue, out_q: queue.Queue, stop: threading.Event):
+    """
+    Middle stage: QR of the first page (lowest page number), deskew, then YOLO on whatever pages are
+    already rendered (up to cfg.yolo_batch_size at a time, so batching still pays
+    off when rendering is ahead). Emits (page_no, page, zone) in page order.
+    """
+    use_yolo = cfg.use_yolo_zone_detection and zone_detector.is_available()
+    first_page = min(layout_keys)
+    try:
+        tail = None
+        while tail is None and not stop.is_set():
+            batch = []
+            item = _get(in_q, stop)
+            while True:
+                if item is _END or isinstance(item, BaseException):
+                    tail = item
+                    break
+                batch.append(item)
+                if len(batch) >= max(1, cfg.yolo_batch_size):
+                    break
+                try:
+                    item = in_q.get_nowait()
+                except queue.Empty:
+                    break
+
+            prepared = []
+            for i, page in batch:
+                if i == first_page:
+                    student.update(_decode_student(page, key, cfg))
+                if cfg.enable_deskew:
+                    with span("deskew", page=i):
+                        page = deskew_image(page, cfg)
+                prepared.append((i, page))
+
+            zones = [None] * len(prepared)
+            if use_yolo:
+                # pages with a cached layout are aligned in the page pipeline instead
+                todo = [k for k, (i, _) in enumerate(prepared)
+                        if layout_cache is None or layout_keys[i] not in layout_cache]
+                if todo:
+                    with span("yolo_batch", pages=len(todo)):
+                        if cfg.multi_zone:
+                            detected = zone_detector.detect_all_zones_batch([prepared[k][1] for k in todo], cfg)
+                        else:
+                            detected = zone_detector.detect_grading_zones_batch([prepared[k][1] for k in todo], cfg)
+                    for k, zone in zip(todo, detected):
+                        zones[k] = zone
+
+            for (i, page), zone in zip(prepared, zones):
+                if not _put(out_q, (i, page, zone), stop):
+                    return
+        if tail is not None:
+            _put(out_q, tail, stop)
+    except Exception as e:
+        _put(out_q, e, stop)
+
+
+def _process_pdf(pdf_path: str, cfg, zone_detector, key: bytes, layout_cache, progress, should_cancel,
+                 pages: tuple | None = None, out_path: str | None = None) -> dict:
+    """
+    Streaming pipeline, three stages connected by bounded queues:
+      render (one page at a time) → QR/deskew/YOLO → checkbox scoring (calling thread)
+    At most ~2 * cfg.page_queue_size + cfg.yolo_batch_size pages are in memory,
+    whatever the page count, and rasterization overlaps with the later stages.
+    """
+    from exam_manager.utils.pdf import pdf_page_count  # lazy import to avoid circulars
+
+    def check_cancel():
+        if should_cancel is not None and should_cancel():
+            raise ProcessingCancelled(f"Processing of {os.path.basename(pdf_path)} cancelled")
+
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF not found: {pdf_path}")
+
+    n_pages = pdf_page_count(pdf_path)
+    if not n_pages:
+        raise RuntimeError("Failed to convert PDF to images.")
+    first, last = pages or (1, n_pages)
+    if not 1 <= first <= last <= n_pages:
+        raise ValueError(f"Page range {first}-{last} outside 1-{n_pages}")
+    page_nos = range(first, last + 1)
+    out_path = out_path or pdf_path
+    check_cancel()
+
     # --- Remaining pages: checkboxes
+    student = {}
     all_results = []
     q_counter = 1
     vis_paths = []
+    page_info = []
 
-    for p in image_paths:
-        page_bgr = cv2.imread(p)
-        if page_bgr is None:
-            continue
+    pages_dir = None
+    vis_writer = None
+    if cfg.save_page_images or cfg.save_visualizations:
+        pages_dir = os.path.splitext(out_path)[0] + "_pages"
+        os.makedirs(pages_dir, exist_ok=True)
+        # overlays are drawn and encoded off the grading path
+        vis_writer = VisualizationWriter(cfg, max_pending=cfg.page_queue_size)
 
-        results, vis, validation = process_exam_page_with_zone_detection(
-            page_bgr, cfg, zone_detector, q_counter
-        )
-        all_results.extend(results)
-        q_counter += len(results)
+    if not cfg.use_layout_cache:
+        layout_cache = None
+    # keyed by page number, the layout is that of the copy (page 1 of a segment = index 0)
+    layout_keys = {i: LayoutCache.make_key(cfg, len(page_nos), i - first) for i in page_nos}
 
-        vis_out = p.replace(".png", "_vis.png")
-        cv2.imwrite(vis_out, vis)
-        vis_paths.append(vis_out)
+    # colour is only needed by the YOLO zone detector
+    grayscale = cfg.raster_grayscale or not cfg.use_yolo_zone_detection
+    stop = threading.Event()
+    rendered = queue.Queue(maxsize=max(1, cfg.page_queue_size))
+    prepared = queue.Queue(maxsize=max(1, cfg.page_queue_size))
+    stages = [
+        _start_stage("render", _render_stage, pdf_path, page_nos, cfg, grayscale, rendered, stop),
+        _start_stage("prepare", _prepare_stage, cfg, zone_detector, key, layout_cache, layout_keys, student,
+                     rendered, prepared, stop),
+    ]
+
+    page_features = []
+    try:
+        while True:
+            check_cancel()
+            try:
+                item = prepared.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            i, page_bgr, zone = item
+
+            features = {} if cfg.cache_features or cfg.save_visualizations else None
+            with trace_attrs(page=i), span("page"):
+                results, vis, validation = process_exam_page_with_zone_detection(
+                    page_bgr, cfg, zone_detector, q_counter, deskewed=True,
+                    detected_zone=None if cfg.multi_zone else zone,
+                    detected_zones=zone if cfg.multi_zone else None,
+                    layout_cache=layout_cache, layout_key=layout_keys[i], features_out=features
+                )
+            if features and cfg.cache_features:
+                page_features.append((i, features))
+            page_info.append({
+                "page": i,
+                "first_question": q_counter,
+                "questions": len(results),
+                "status": validation.get("error") or validation.get("warning")
+                          or ("layout_cache" if validation.get("layout_cache") else "ok"),
+            })
+            all_results.extend(results)
+            q_counter += len(results)
+
+            if vis_writer is not None:
+                raw_path = os.path.join(pages_dir, f"page_{i}.png") if cfg.save_page_images else None
+                overlay_path = vis_path(pages_dir, i, cfg) if cfg.save_visualizations else None
+                vis_writer.submit(overlay_path, vis, features, results, raw_path)
+
+            if progress is not None:
+                progress(i - first + 1, len(page_nos), results)
+    finally:
+        # unblocks the producers on cancel/error; they exit at their next put
+        stop.set()
+        for thread in stages:
+            thread.join()
+        if vis_writer is not None:
+            vis_paths = vis_writer.close()
 
     # --- Summarize + grade
     validation = validate_detection_results(all_results)
-    grading = grade_exam(all_results, cfg)
-    summary = {
+    with span("grading"):
+        grading = grade_exam(all_results, cfg)
+    if cfg.cache_features:
+        # lets regrade_from_features re-apply new thresholds without the images
+        with span("feature_write"):
+            save_features(features_path(out_path), page_features, student, page_info, cfg)
+    return {
         "student": student,
         "results": all_results,
         "total_questions": len(all_results),
+        "pages": page_info,
         "validation": validation,
         "grading": grading,
         "visualizations": vis_paths,
     }
-
-
-    out_json = os.path.splitext(pdf_path)[0] + "_grades.json"
-    with open(out_json, "w", encoding="utf-8") as f:
-        f.write(json.dumps(summary, indent=2, ensure_ascii=False))
-
-    return summary
@@ -1,33 +1,173 @@
 import os
+import csv
 import json
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 from cryptography.fernet import Fernet
 import qrcode
+from PIL import Image, ImageDraw
 
+from exam_manager.utils.helpers import QR_DEFAULT_REGION
 
 
+# A4 at 200 dpi, the page geometry crop_qr_region expects
+SHEET_SIZE = (1654, 2339)
+SHEET_DPI = 200
+
+ROSTER_COLUMNS = {
+    "name": ("name", "nom", "student_name", "full_name"),
+    "id": ("id", "student_id", "numero", "number", "matricule"),
+    "class": ("class", "classe", "group", "groupe"),
+    "university": ("university", "universite", "université", "school"),
+}
+
+
+def encrypt_student(fernet: Fernet, name, student_id, student_class, university) -> str:
+    student_data = {
+        "enc_name": fernet.encrypt(name.encode()).decode(),
+        "enc_id": fernet.encrypt(student_id.encode()).decode(),
+        "class": student_class,
+        "university": university,
+    }
+    return json.dumps(student_data)
+
+
+def make_qr_image(json_string: str):
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L,
+                       box_size=8, border=2)
+    qr.add_data(json_string)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white")
+
 
 def generate_qr(name, student_id, student_class, university, key):
         fernet = Fernet(key)
-        encrypted_name = fernet.encrypt(name.encode()).decode()
-        encrypted_id = fernet.encrypt(student_id.encode()).decode()
-
-        student_data = {
-            "enc_name": encrypted_name,
-            "enc_id": encrypted_id,
-            "class": student_class,
-            "university": university,
-        }
-        json_string = json.dumps(student_data)
-
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L,
-                        box_size=8, border=2)
-        qr.add_data(json_string)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
+        json_string = encrypt_student(fernet, name, student_id, student_class, university)
+        encrypted_name = json.loads(json_string)["enc_name"]
+
+        img = make_qr_image(json_string)
 
         out_dir = os.path.join(os.path.expanduser("~"), "qrdb")
         os.makedirs(out_dir, exist_ok=True)
         filename = os.path.join(out_dir, f"qr_{encrypted_name}.png")
         img.save(filename)
 
-        return img       
\ No newline at end of file
+        return img
+
+
+# ---------- Roster batch generation ----------
+
+def read_roster(csv_path: str) -> list[dict]:
+    """
+    Read a CSV roster into dicts with name/id/class/university keys.
+    Header names are matched case-insensitively (english or french); delimiter is sniffed.
+    """
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(f, dialect=dialect)
+        headers = {h.strip().lower(): h for h in (reader.fieldnames or [])}
+
+        mapping = {}
+        for field, aliases in ROSTER_COLUMNS.items():
+            for alias in aliases:
+                if alias in headers:
+                    mapping[field] = headers[alias]
+                    break
+        missing = [f for f in ("name", "id") if f not in mapping]
+        if missing:
+            raise ValueError(f"Roster is missing column(s): {', '.join(missing)}")
+
+        students = []
+        for row in reader:
+            student = {field: (row.get(col) or "").strip() for field, col in mapping.items()}
+            if not student["name"] and not student["id"]:
+                continue
+            student.setdefault("class", "")
+            student.setdefault("university", "")
+            students.append(student)
+    return students
+
+
+# Per-process Fernet, built once by _init_qr_worker
+_worker_fernet = None
+
+
+def _init_qr_worker(key: bytes):
+    global _worker_fernet
+    _worker_fernet = Fernet(key)
+
+
+def _qr_for_student(student: dict) -> bytes:
+    json_string = encrypt_student(_worker_fernet, student["name"], student["id"],
+                                  student.get("class", ""), student.get("university", ""))
+    img = make_qr_image(json_string).get_image().convert("L")
+    w, h = QR_DEFAULT_REGION[2], QR_DEFAULT_REGION[3]
+    # NEAREST keeps module edges sharp; return raw bytes (cheap to pickle back)
+    return img.resize((w, h), Image.NEAREST).tobytes()
+
+
+def generate_qr_batch(students: list[dict], key: bytes, workers: int | None = None) -> list:
+    """
+    Encrypt + encode QR codes for every student on a process pool (one Fernet
+    per worker). Returns PIL grayscale images sized for the sheet QR region, in roster order.
+    """
+    if not students:
+        return []
+    w, h = QR_DEFAULT_REGION[2], QR_DEFAULT_REGION[3]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(students)))
+    if workers == 1:
+        _init_qr_worker(key)
+        raw = [_qr_for_student(s) for s in students]
+    else:
+        # spawn: this also runs from a QThread of the GUI, where forking a process
+        # with Qt/torch threads alive is not safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_qr_worker, initargs=(key,)) as pool:
+            raw = list(pool.map(_qr_for_student, students, chunksize=max(1, len(students) // (workers * 4))))
+    return [Image.frombytes("L", (w, h), b) for b in raw]
+
+
+def _load_sheet_template(template_path: str | None) -> Image.Image:
+    if not template_path:
+        return Image.new("L", SHEET_SIZE, 255)
+    if template_path.lower().endswith(".pdf"):
+        from pdf2image import convert_from_path
+        page = convert_from_path(template_path, dpi=SHEET_DPI, first_page=1, last_page=1)[0]
+    else:
+        page = Image.open(template_path)
+    return page.convert("L").resize(SHEET_SIZE)
+
+
+def compose_exam_sheets(students: list[dict], key: bytes, out_pdf: str,
+                        template_path: str | None = None, workers: int | None = None) -> str:
+    """
+    Build one print-ready multi-page PDF: one sheet per student with the encrypted
+    QR pasted where crop_qr_region looks for it, and the student's name/ID printed
+    in the top-left corner. `template_path` (image or PDF first page) is used as background.
+    """
+    if not students:
+        raise ValueError("Roster is empty.")
+
+    qr_images = generate_qr_batch(students, key, workers)
+    template = _load_sheet_template(template_path)
+    x, y = QR_DEFAULT_REGION[0], QR_DEFAULT_REGION[1]
+
+    sheets = []
+    for student, qr_img in zip(students, qr_images):
+        sheet = template.copy()
+        sheet.paste(qr_img, (x, y))
+        draw = ImageDraw.Draw(sheet)
+        draw.text((80, 90), f"{student['name']}  —  {student['id']}", fill=0)
+        if student.get("class") or student.get("university"):
+            draw.text((80, 120), f"{student.get('class', '')}  {student.get('university', '')}".strip(), fill=0)
+        sheets.append(sheet)
+
+    out_dir = os.path.dirname(os.path.abspath(out_pdf))
+    os.makedirs(out_dir, exist_ok=True)
+    sheets[0].save(out_pdf, "PDF", resolution=SHEET_DPI, save_all=True, append_images=sheets[1:])
+    return out_pdf
@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from exam_manager.ui.exam_config import ExamConfig
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    exam          TEXT NOT NULL,
+    started       TEXT NOT NULL,
+    finished      TEXT,
+    source        TEXT,
+    config_json   TEXT
+);
+CREATE TABLE IF NOT EXISTS students (
+    student_id    TEXT PRIMARY KEY,
+    name          TEXT,
+    class         TEXT,
+    university    TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    exam          TEXT NOT NULL,
+    pdf_path      TEXT NOT NULL,
+    student_id    TEXT,
+    run_id        INTEGER REFERENCES runs(id),
+    score         REAL,
+    letter        TEXT,
+    total_questions INTEGER,
+    answered      INTEGER,
+    warnings      TEXT,
+    qr_error      TEXT,
+    graded_at     TEXT,
+    UNIQUE (exam, pdf_path)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    result_id     INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    page_no       INTEGER NOT NULL,
+    first_question INTEGER,
+    questions     INTEGER,
+    status        TEXT,
+    PRIMARY KEY (result_id, page_no)
+);
+CREATE TABLE IF NOT EXISTS answers (
+    result_id     INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    question      INTEGER NOT NULL,
+    grade         TEXT,
+    PRIMARY KEY (result_id, question)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_students_class ON students(class);
+CREATE INDEX IF NOT EXISTS idx_results_student ON results(student_id);
+CREATE INDEX IF NOT EXISTS idx_results_exam_student ON results(exam, student_id);
+"""
+
+
+def exam_name(cfg: ExamConfig) -> str:
+    return cfg.exam_name or cfg.layout_template or "default"
+
+
+class ResultStore:
+    """
+    Local SQLite store for graded exams: runs, students, per-PDF results, pages
+    and answers. Re-grading a PDF of the same exam replaces its previous result
+    (upsert on (exam, pdf_path)); save_many() writes a whole batch in one transaction.
+    Safe to share between threads (one connection behind a lock).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if os.path.dirname(os.path.abspath(db_path)):
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- writes ----------
+    def start_run(self, exam: str, cfg: ExamConfig | None = None, source: str = "") -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (exam, started, source, config_json) VALUES (?, ?, ?, ?)",
+                (exam, datetime.now().isoformat(timespec="seconds"), source,
+                 json.dumps(cfg.__dict__, ensure_ascii=False) if cfg is not None else None),
+            )
+            return cur.lastrowid
+
+    def finish_run(self, run_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET finished = ? WHERE id = ?",
+                               (datetime.now().isoformat(timespec="seconds"), run_id))
+
+    def save(self, pdf_path: str, summary: dict, exam: str, run_id: int | None = None) -> int:
+        return self.save_many([(pdf_path, summary)], exam, run_id)[0]
+
+    def save_many(self, items: list, exam: str, run_id: int | None = None) -> list:
+        """
+        Insert/replace the results of [(pdf_path, process_pdf summary), ...] in a
+        single transaction. Returns the result ids.
+        """
+        ids = []
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            for pdf_path, summary in items:
+                student = summary.get("student", {})
+                student_id = None if student.get("error") else student.get("id")
+                if student_id:
+                    self._conn.execute(
+                        "INSERT INTO students (student_id, name, class, university) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(student_id) DO UPDATE SET "
+                        "name = excluded.name, class = excluded.class, university = excluded.university",
+                        (student_id, student.get("name"), student.get("class"), student.get("university")),
+                    )
+
+                grading = summary.get("grading", {})
+                validation = summary.get("validation", {})
+                result_id = self._conn.execute(
+                    "INSERT INTO results (exam, pdf_path, student_id, run_id, score, letter, total_questions, "
+                    "answered, warnings, qr_error, graded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(exam, pdf_path) DO UPDATE SET "
+                    "student_id = excluded.student_id, run_id = excluded.run_id, score = excluded.score, "
+                    "letter = excluded.letter, total_questions = excluded.total_questions, "
+                    "answered = excluded.answered, warnings = excluded.warnings, "
+                    "qr_error = excluded.qr_error, graded_at = excluded.graded_at "
+                    "RETURNING id",
+                    (exam, os.path.abspath(pdf_path), student_id, run_id, grading.get("score"),
+                     grading.get("letter"), summary.get("total_questions"), validation.get("answered_questions"),
+                     json.dumps(validation.get("warnings", []), ensure_ascii=False),
+                     student.get("error"), now),
+                ).fetchone()[0]
+
+                # re-grade: the previous pages/answers are replaced as a whole
+                self._conn.execute("DELETE FROM answers WHERE result_id = ?", (result_id,))
+                self._conn.execute("DELETE FROM pages WHERE result_id = ?", (result_id,))
+                self._conn.executemany(
+                    "INSERT INTO answers (result_id, question, grade) VALUES (?, ?, ?)",
+                    [(result_id, r["question"], r.get("grade")) for r in summary.get("results", [])],
+                )
+                self._conn.executemany(
+                    "INSERT INTO pages (result_id, page_no, first_question, questions, status) VALUES (?, ?, ?, ?, ?)",
+                    [(result_id, p["page"], p.get("first_question"), p.get("questions"), p.get("status"))
+                     for p in summary.get("pages", [])],
+                )
+                ids.append(result_id)
+        return ids
+
+    # ---------- queries ----------
+    def _query(self, sql: str, params=()) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def student_results(self, student_id: str) -> list[dict]:
+        """Every exam result of one student, newest first."""
+        return self._query(
+            "SELECT r.exam, r.score, r.letter, r.total_questions, r.answered, r.pdf_path, r.graded_at "
+            "FROM results r WHERE r.student_id = ? ORDER BY r.graded_at DESC", (student_id,))
+
+    def cohort(self, exam: str, student_class: str | None = None) -> list[dict]:
+        """Class roster with results for one exam (all classes when student_class is None)."""
+        sql = ("SELECT s.student_id, s.name, s.class, r.score, r.letter, r.answered, r.total_questions, r.pdf_path "
+               "FROM results r JOIN students s ON s.student_id = r.student_id WHERE r.exam = ?")
+        params = [exam]
+        if student_class is not None:
+            sql += " AND s.class = ?"
+            params.append(student_class)
+        return self._query(sql + " ORDER BY s.class, s.name", params)
+
+    def exam_stats(self, exam: str) -> dict:
+        rows = self._query(
+            "SELECT COUNT(*) AS n, AVG(score) AS mean_score, MIN(score) AS min_score, MAX(score) AS max_score, "
+            "SUM(student_id IS NULL) AS unidentified FROM results WHERE exam = ?", (exam,))
+        stats = rows[0]
+        stats["letters"] = {r["letter"]: r["n"] for r in self._query(
+            "SELECT letter, COUNT(*) AS n FROM results WHERE exam = ? GROUP BY letter", (exam,))}
+        return stats
+
+    def answers(self, exam: str, student_id: str) -> list[dict]:
+        return self._query(
+            "SELECT a.question, a.grade FROM answers a JOIN results r ON r.id = a.result_id "
+            "WHERE r.exam = ? AND r.student_id = ? ORDER BY a.question", (exam, student_id))
+
+    def exams(self) -> list[str]:
+        return [r["exam"] for r in self._query("SELECT DISTINCT exam FROM results ORDER BY exam")]
@@ -0,0 +1,69 @@
+import logging
+
+from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.core.pdf_processing import decode_qr_from_first_page
+from exam_manager.utils.tracing import span
+
+
+def scan_page_qr(pdf_path: str, page_no: int, key, cfg: ExamConfig) -> dict | None:
+    """
+    Student named by the QR of one page, or None when the page has no readable QR.
+    Pages are rendered in grayscale at cfg.stack_qr_dpi and only the fast decode
+    tiers are tried (most pages of a stack carry no QR).
+    """
+    from exam_manager.utils.pdf import render_pdf_page
+    with span("rasterize_qr", page=page_no):
+        page = render_pdf_page(pdf_path, page_no, dpi=cfg.stack_qr_dpi, grayscale=True)
+    try:
+        with span("qr", page=page_no):
+            return decode_qr_from_first_page(page, key, cfg, deskew=False)
+    except Exception:
+        return None
+
+
+def scan_qr_pages(pdf_path: str, page_nos, key, cfg: ExamConfig) -> list:
+    """[(page_no, student | None)] for every page in `page_nos`."""
+    return [(i, scan_page_qr(pdf_path, i, key, cfg)) for i in page_nos]
+
+
+def _student_key(student: dict | None):
+    return None if student is None else (student.get("id"), student.get("name"))
+
+
+def split_segments(scans: list, pages_per_student: int = 0) -> list:
+    """
+    Cut a stacked class scan into per-student page ranges from [(page_no, student | None)].
+    A copy starts at every page whose QR names another student than the current copy;
+    pages without a readable QR belong to the copy before them. With `pages_per_student`,
+    longer copies are cut every pages_per_student pages (a copy whose QR could not be
+    read at scan time; its first page is decoded again, with every tier, when graded).
+    Returns [{"pages": (first, last), "student": dict | None}] in page order.
+    """
+    segments = []
+    for page_no, student in sorted(scans, key=lambda s: s[0]):
+        current = segments[-1] if segments else None
+        if current is None or (student is not None and _student_key(student) != _student_key(current["student"])):
+            segments.append({"pages": [page_no, page_no], "student": student})
+        else:
+            current["pages"][1] = page_no
+
+    if pages_per_student > 0:
+        cut = []
+        for seg in segments:
+            first, last = seg["pages"]
+            for start in range(first, last + 1, pages_per_student):
+                cut.append({"pages": [start, min(last, start + pages_per_student - 1)],
+                            "student": seg["student"] if start == first else None})
+        segments = cut
+
+    seen = {}
+    for seg in segments:
+        seg["pages"] = tuple(seg["pages"])
+        key = _student_key(seg["student"])
+        if key is None:
+            logging.warning(f"Pages {seg['pages'][0]}-{seg['pages'][1]}: no student QR found")
+        elif key in seen:
+            logging.warning(f"Student {key[0]} appears twice (pages {seen[key][0]}- and {seg['pages'][0]}-)")
+        else:
+            seen[key] = seg["pages"]
+    return segments
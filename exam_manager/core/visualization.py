@@ -0,0 +1,162 @@
+import contextvars
+import logging
+import os
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.utils.helpers import to_bgr
+from exam_manager.utils.tracing import span
+
+
+ZONE_COLOR = (255, 128, 0)
+BOX_COLOR = (160, 160, 160)
+CHOSEN_COLOR = (0, 170, 0)
+MISSING_COLOR = (0, 0, 220)
+
+_ENCODE_PARAMS = {
+    "jpg": lambda q: [cv2.IMWRITE_JPEG_QUALITY, q],
+    "webp": lambda q: [cv2.IMWRITE_WEBP_QUALITY, q],
+    "png": lambda q: [cv2.IMWRITE_PNG_COMPRESSION, 3],
+}
+
+
+def vis_path(pages_dir: str, page_no: int, cfg: ExamConfig) -> str:
+    return os.path.join(pages_dir, f"page_{page_no}_vis.{cfg.vis_format}")
+
+
+def render_overlay(page: np.ndarray, features: dict, results: list, cfg: ExamConfig) -> np.ndarray:
+    """
+    Page with the detected zone(s), every checkbox and the chosen option of each question,
+    downscaled to cfg.vis_max_width (0 = full size) before drawing.
+    `features` is the features_out dict of the page (box geometry relative to features["zone"]).
+    """
+    scale = 1.0
+    if cfg.vis_max_width and page.shape[1] > cfg.vis_max_width:
+        scale = cfg.vis_max_width / page.shape[1]
+        # INTER_AREA is ~7x slower at non-integer ratios; linear is fine for a preview
+        page = cv2.resize(page, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    out = to_bgr(page).copy()
+    thick = max(1, int(round(2 * scale)))
+
+    def rect(x, y, w, h, color, t=thick):
+        cv2.rectangle(out, (int(x * scale), int(y * scale)), (int((x + w) * scale), int((y + h) * scale)), color, t)
+
+    zone = features.get("zone")
+    for zx, zy, zw, zh in features.get("zones") or ([zone] if zone is not None else []):
+        rect(zx, zy, zw, zh, ZONE_COLOR, 2 * thick)
+    if not features.get("question"):
+        return out
+
+    labels = cfg.option_labels
+    if len(labels) != cfg.options_per_question:
+        labels = [f"opt_{i}" for i in range(cfg.options_per_question)]
+    chosen = {r["question"]: labels.index(r["grade"]) for r in results if r["grade"] in labels}
+
+    ox, oy = zone[0], zone[1]
+    first_of_question = {}
+    for q, o, x, y, w, h in zip(features["question"], features["option"], features["x"], features["y"],
+                                features["w"], features["h"]):
+        x, y = x + ox, y + oy
+        first_of_question.setdefault(q, (x, y))
+        picked = chosen.get(q) == o
+        rect(x, y, w, h, CHOSEN_COLOR if picked else BOX_COLOR, 2 * thick if picked else thick)
+
+    font = 0.4 + 0.6 * scale
+    for q, (x, y) in first_of_question.items():
+        color = CHOSEN_COLOR if q in chosen else MISSING_COLOR
+        org = (max(0, int(x * scale) - int(40 * font)), int(y * scale) + int(12 * font))
+        cv2.putText(out, f"Q{q}", org, cv2.FONT_HERSHEY_SIMPLEX, 0.5 * font, color, 1, cv2.LINE_AA)
+    return out
+
+
+def write_image(path: str, image: np.ndarray, cfg: ExamConfig) -> bool:
+    params = _ENCODE_PARAMS.get(cfg.vis_format, _ENCODE_PARAMS["jpg"])(cfg.vis_quality)
+    return cv2.imwrite(path, image, params)
+
+
+class VisualizationWriter:
+    """
+    Background thread that draws and encodes page visualizations, so neither the
+    overlay nor the JPEG/WebP encoding runs on the grading path. The queue is
+    bounded: when the writer falls behind, submit() waits instead of piling up pages.
+    """
+
+    def __init__(self, cfg: ExamConfig, max_pending: int = 4):
+        self.cfg = cfg
+        self.paths = []
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = threading.Thread(target=contextvars.copy_context().run, args=(self._run,),
+                                        name="vis-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str | None, page: np.ndarray, features: dict | None, results: list,
+               raw_path: str | None = None):
+        """Queue one page; `raw_path` also saves the page itself (lossless, debug), path=None skips the overlay."""
+        if path:
+            self.paths.append(path)
+        self._queue.put((path, page, features, results, raw_path))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, page, features, results, raw_path = item
+            try:
+                with span("vis_write"):
+                    if raw_path:
+                        cv2.imwrite(raw_path, page)
+                    if path:
+                        write_image(path, render_overlay(page, features, results, self.cfg), self.cfg)
+            except Exception as e:
+                logging.error(f"Visualization {path or raw_path} failed: {e}")
+
+    def close(self) -> list:
+        """Wait for the queued pages to be written; returns the visualization paths."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        return self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def visualize_page(pdf_path: str, page_no: int, cfg: ExamConfig) -> np.ndarray | None:
+    """
+    Render the visualization of one page on demand, from the PDF and its cached
+    <pdf>_features.npz (needs cfg.cache_features when the PDF was graded).
+    Returns None when the page has no cached features.
+    """
+    from exam_manager.core.feature_cache import features_path, load_features
+    from exam_manager.utils.detection_pipline_processes import apply_checkbox_features
+    from exam_manager.utils.deskew_image import deskew_image
+    from exam_manager.utils.pdf import render_pdf_page
+
+    path = features_path(pdf_path)
+    if not os.path.exists(path):
+        return None
+    feats = load_features(path)
+    on_page = feats["page"] == page_no
+    zones = feats["zones"][feats["zones"][:, 0] == page_no]
+    if not on_page.any() or not len(zones):
+        return None
+
+    # stored geometry is in page coordinates
+    features = {name: feats[name][on_page].tolist()
+                for name in ("question", "option", "x", "y", "w", "h", "inner_ratio", "edge_ratio", "valid")}
+    features["zone"] = (0, 0)
+    features["zones"] = [tuple(int(v) for v in z[1:]) for z in zones]
+    results = apply_checkbox_features(features, cfg)
+
+    page = render_pdf_page(pdf_path, page_no, dpi=feats["meta"]["settings"].get("raster_dpi", cfg.raster_dpi))
+    if cfg.enable_deskew:
+        page = deskew_image(page, cfg)
+    return render_overlay(page, features, results, cfg)
@@ -0,0 +1,168 @@
+import abc
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def exported_path(model_path: str, imgsz: int, int8: bool = False) -> str:
+    """ONNX file exported from the YOLO weights: <weights>_<imgsz>[.int8].onnx next to them."""
+    stem = os.path.splitext(model_path)[0]
+    return f"{stem}_{imgsz}{'.int8' if int8 else ''}.onnx"
+
+
+def _is_fresh(path: str, source: str) -> bool:
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source)
+
+
+def export_onnx(model_path: str, imgsz: int = 640, int8: bool = False) -> str:
+    """
+    Export the ultralytics weights to ONNX (dynamic batch) and optionally quantize
+    the weights to int8 with onnxruntime. Exports are reused until the weights change.
+    Returns the path of the ONNX file to load.
+    """
+    onnx_path = exported_path(model_path, imgsz)
+    if not _is_fresh(onnx_path, model_path):
+        t0 = time.perf_counter()
+        from ultralytics import YOLO
+        out = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        os.replace(out, onnx_path)
+        logging.info(f"Exported {model_path} to {onnx_path} in {time.perf_counter() - t0:.1f}s")
+
+    if not int8:
+        return onnx_path
+
+    int8_path = exported_path(model_path, imgsz, int8=True)
+    if not _is_fresh(int8_path, onnx_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        logging.info(f"Quantized {onnx_path} to int8 ({os.path.getsize(int8_path) / 2**20:.1f} MB)")
+    return int8_path
+
+
+def letterbox(image: np.ndarray, size: int) -> tuple[np.ndarray, float, tuple]:
+    """
+    Resize keeping the aspect ratio and pad to size x size (grey 114, like ultralytics).
+    Returns (padded RGB image, scale, (pad_x, pad_y)).
+    """
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    nw, nh = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - nw) // 2, (size - nh) // 2
+    out = np.full((size, size, 3), 114, dtype=np.uint8)
+    out[pad_y:pad_y + nh, pad_x:pad_x + nw] = resized
+    return cv2.cvtColor(out, cv2.COLOR_BGR2RGB), scale, (pad_x, pad_y)
+
+
+class Boxes:
+    """Detections of one image in the ultralytics layout (boxes.xyxy / boxes.conf)."""
+
+    def __init__(self, xyxy, conf):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class Result:
+    def __init__(self, boxes: Boxes):
+        self.boxes = boxes
+
+
+class ExportedZoneModel(abc.ABC):
+    """
+    Callable with the ultralytics model interface (model(images, conf=..., verbose=...)
+    → [result with .boxes]) on top of an exported ONNX graph, so YOLOZoneDetector
+    keeps the same code path for every backend. Subclasses implement _infer.
+    """
+
+    def __init__(self, onnx_path: str, imgsz: int = 640, iou: float = 0.7):
+        self.onnx_path = onnx_path
+        self.imgsz = imgsz
+        self.iou = iou
+
+    @abc.abstractmethod
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        """Raw network output for a (N, 3, imgsz, imgsz) float batch."""
+
+    def __call__(self, images, conf: float = 0.25, verbose: bool = False) -> list:
+        if isinstance(images, np.ndarray):
+            images = [images]
+        prepared = [letterbox(img, self.imgsz) for img in images]
+        batch = np.stack([p[0] for p in prepared]).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        output = self._infer(batch)
+        return [Result(self._postprocess(out, conf, scale, pad, img.shape[:2]))
+                for out, (_, scale, pad), img in zip(output, prepared, images)]
+
+    def _postprocess(self, out: np.ndarray, conf: float, scale: float, pad: tuple, shape: tuple) -> Boxes:
+        """One YOLOv8-style output (4 + classes, anchors) → NMS'ed boxes in page coordinates."""
+        if out.shape[0] > out.shape[1]:
+            out = out.T
+        scores = out[4:].max(axis=0)
+        keep = scores >= conf
+        if not keep.any():
+            return Boxes([], [])
+        cx, cy, w, h = out[:4, keep]
+        scores = scores[keep]
+        x1 = (cx - w / 2 - pad[0]) / scale
+        y1 = (cy - h / 2 - pad[1]) / scale
+        xywh = np.stack([x1, y1, w / scale, h / scale], axis=1)
+        idx = np.asarray(cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), conf, self.iou), dtype=int).reshape(-1)
+        xyxy = np.column_stack([xywh[idx, 0], xywh[idx, 1], xywh[idx, 0] + xywh[idx, 2], xywh[idx, 1] + xywh[idx, 3]])
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, shape[0])
+        return Boxes(xyxy, scores[idx])
+
+
+class OnnxZoneModel(ExportedZoneModel):
+    def __init__(self, onnx_path: str, imgsz: int = 640, threads: int = 0):
+        super().__init__(onnx_path, imgsz)
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoZoneModel(ExportedZoneModel):
+    def __init__(self, onnx_path: str, imgsz: int = 640, threads: int = 0):
+        super().__init__(onnx_path, imgsz)
+        import openvino as ov
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = ov.Core().compile_model(onnx_path, "CPU", config)
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled(batch)[0]
+
+
+def load_zone_model(model_path: str, backend: str = "torch", imgsz: int = 640, int8: bool = False,
+                    threads: int = 0):
+    """
+    Model for `backend`: the ultralytics YOLO for "torch", the exported ONNX graph
+    run by ONNX Runtime ("onnx") or OpenVINO ("openvino") otherwise.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown yolo_backend {backend!r}, expected one of {BACKENDS}")
+    if backend == "torch":
+        from ultralytics import YOLO  # heavy (torch), only imported when needed
+        return YOLO(model_path)
+
+    onnx_path = export_onnx(model_path, imgsz, int8)
+    if backend == "onnx":
+        return OnnxZoneModel(onnx_path, imgsz, threads)
+    return OpenVinoZoneModel(onnx_path, imgsz, threads)
@@ -0,0 +1,51 @@
+import argparse
+import sys
+import time
+
+#local imports
+from .ui.exam_config import ExamConfig, CONFIG_PATH
+from .core.batch_processing import collect_pdfs
+from .core.feature_cache import regrade_pdfs
+from .utils.tracing import setup_logging
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m exam_manager.regrade",
+        description="Re-grade already processed PDFs from their cached checkbox features "
+                    "(after changing thresholds or option labels), without the images.",
+    )
+    parser.add_argument("inputs", nargs="+", help="PDF files, folders or glob patterns")
+    parser.add_argument("-c", "--config", default=CONFIG_PATH, help="ExamConfig JSON file")
+    parser.add_argument("--db", help="also update this SQLite result store")
+    parser.add_argument("--exam", help="exam name in the result store (overrides cfg.exam_name)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    cfg = ExamConfig.from_json(args.config)
+    setup_logging(cfg)
+    if args.exam:
+        cfg.exam_name = args.exam
+
+    pdfs = collect_pdfs(args.inputs)
+    t0 = time.perf_counter()
+    summaries = regrade_pdfs(pdfs, cfg)
+    db = args.db or cfg.result_store_path
+    if db and summaries:
+        from .core.result_store import ResultStore, exam_name
+        with ResultStore(db) as store:
+            run_id = store.start_run(exam_name(cfg), cfg, source="regrade")
+            store.save_many(list(summaries.items()), exam_name(cfg), run_id)
+            store.finish_run(run_id)
+
+    print(f"Re-graded {len(summaries)}/{len(pdfs)} PDF(s) in {time.perf_counter() - t0:.2f}s")
+    missing = len(pdfs) - len(summaries)
+    if missing:
+        print(f"{missing} PDF(s) have no cached features and need a full run.", file=sys.stderr)
+    return 0 if not missing else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
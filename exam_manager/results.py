@@ -0,0 +1,47 @@
+import argparse
+import json
+import sys
+
+#local imports
+from .ui.exam_config import ExamConfig, CONFIG_PATH
+from .core.result_store import ResultStore
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m exam_manager.results",
+        description="Query the SQLite result store filled by the GUI or the batch CLI.",
+    )
+    parser.add_argument("--db", help="SQLite result store (default: cfg.result_store_path)")
+    parser.add_argument("-c", "--config", default=CONFIG_PATH, help="ExamConfig JSON file")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--student", help="all results of one student id")
+    group.add_argument("--cohort", metavar="EXAM", help="results of one exam (filter with --class)")
+    group.add_argument("--stats", metavar="EXAM", help="score statistics of one exam")
+    group.add_argument("--exams", action="store_true", help="list the exams in the store")
+    parser.add_argument("--class", dest="student_class", help="class filter for --cohort")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    db = args.db or ExamConfig.from_json(args.config).result_store_path
+    if not db:
+        print("No result store configured (use --db or set result_store_path).", file=sys.stderr)
+        return 1
+
+    with ResultStore(db) as store:
+        if args.student:
+            rows = store.student_results(args.student)
+        elif args.cohort:
+            rows = store.cohort(args.cohort, args.student_class)
+        elif args.stats:
+            rows = store.exam_stats(args.stats)
+        else:
+            rows = store.exams()
+    print(json.dumps(rows, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
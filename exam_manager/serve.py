@@ -0,0 +1,68 @@
+import argparse
+import signal
+import sys
+
+#local imports
+from .ui.exam_config import ExamConfig, CONFIG_PATH
+from .utils.key import load_key
+from .utils.tracing import setup_logging
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m exam_manager.serve",
+        description="Local grading service: keeps the zone detector warm and grades PDFs submitted over HTTP.",
+    )
+    parser.add_argument("-c", "--config", default=CONFIG_PATH, help="ExamConfig JSON file")
+    parser.add_argument("--host", help="address to listen on (overrides cfg.service_host)")
+    parser.add_argument("-p", "--port", type=int, help="TCP port (overrides cfg.service_port)")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP (overrides cfg.service_socket)")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (overrides cfg.service_workers)")
+    parser.add_argument("--db", help="SQLite result store (overrides cfg.result_store_path)")
+    parser.add_argument("--exam", help="exam name the results are filed under (overrides cfg.exam_name)")
+    parser.add_argument("--log-level", help="override cfg.log_level (DEBUG, INFO, WARNING, OFF)")
+    return parser
+
+
+def _stop(*_):
+    raise KeyboardInterrupt
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    cfg = ExamConfig.from_json(args.config)
+    if args.log_level:
+        cfg.log_level = args.log_level
+    if args.db:
+        cfg.result_store_path = args.db
+    if args.exam:
+        cfg.exam_name = args.exam
+    setup_logging(cfg)
+
+    from .core.grading_service import GradingService, make_server
+    key = load_key()
+    print(key[1])
+    service = GradingService(cfg, key, workers=args.workers)
+    service.warm()
+    socket_path = args.socket if args.socket is not None else cfg.service_socket
+    server = make_server(service, args.host or cfg.service_host, args.port or cfg.service_port, socket_path)
+    where = socket_path or "http://{}:{}".format(*server.server_address[:2])
+    print(f"Grading service on {where} with {service.workers} worker(s). Ctrl+C to stop.")
+
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path:
+            import os
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+
+#local imports
+from .utils.key import load_key
+from .core.qr_encode import read_roster, compose_exam_sheets
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m exam_manager.sheets",
+        description="Generate encrypted QR codes for a CSV roster and compose one print-ready PDF.",
+    )
+    parser.add_argument("roster", help="CSV with name/id (and optional class/university) columns")
+    parser.add_argument("-o", "--output", default="exam_sheets.pdf", help="output PDF path")
+    parser.add_argument("-t", "--template", default=None, help="background sheet (image or PDF first page)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: all cores)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    students = read_roster(args.roster)
+    if not students:
+        print("Roster is empty.", file=sys.stderr)
+        return 1
+
+    key, msg = load_key()
+    print(msg)
+    out = compose_exam_sheets(students, key, args.output, template_path=args.template, workers=args.workers)
+    print(f"Wrote {len(students)} sheet(s) to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
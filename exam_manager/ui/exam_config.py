@@ -9,26 +9,85 @@ class ExamConfig:
         self.option_labels = ["bon", "moyen", "non"]  # labels, highest→lowest
         self.use_adaptive_threshold = True # robust mode (voting of 3 methods)
         self.black_ratio_threshold = 0.22  # used by simple classifier
-        self.qr_crop_region = None         # (x,y,w,h) or None
+        self.qr_crop_region = None         # (x,y,w,h) at 200 dpi or None for the default corner
+        self.qr_widen_margin = 0.5         # widened QR retry: grow the crop by this × size per side
+        self.stack_qr_dpi = 120            # stacked class scans: DPI of the per-page QR scan
+        self.stack_pages_per_student = 0   # stacked scans: pages per copy (0 = only split on QR changes)
         self.enable_deskew = False         # optional
+        self.deskew_angle_tolerance = 0.15 # skip the warp below this skew (degrees)
+        self.deskew_max_dim = 1024         # longest side of the page copy used to measure skew
+        self.deskew_max_angle = 10.0       # skew search range (± degrees)
+
+        # Rasterization settings
+        self.raster_dpi = 200              # DPI used to render PDF pages
+        self.raster_grayscale = False      # render single-channel pages (forced when YOLO is off)
+        self.page_queue_size = 4           # pages buffered between render / YOLO / scoring stages (bounds memory)
+        self.save_page_images = False      # also write the raw page PNGs to <pdf>_pages/ (debug only)
+        self.save_visualizations = True    # overlay thumbnails (zone, boxes, chosen option) in <pdf>_pages/
+        self.vis_format = "jpg"            # "jpg", "webp" or "png"
+        self.vis_max_width = 1000          # thumbnail width in px, 0 = full resolution
+        self.vis_quality = 80              # JPEG/WebP quality
+        self.review_cache_mb = 256         # decoded pages kept by the review tab
+        self.review_prefetch = 3           # pages decoded ahead while reviewing
+
+        # Timing / logging
+        self.trace_stages = True           # per-stage timing spans, summarized under "timings" in the grades JSON
+        self.trace_export = ""             # "", "json" or "chrome": also write <pdf>_trace.json
+        self.log_level = "INFO"            # "DEBUG" adds per-question details, "OFF" silences the pipeline
+        self.log_json = False              # one JSON object per log line
+        self.startup_budget_ms = 1500      # warn when the window takes longer than this to appear
+
+        # Result store
+        self.exam_name = ""                # exam the results are filed under ("" = layout_template or "default")
+        self.result_store_path = ""        # SQLite file for graded results, "" = only the *_grades.json files
 
         # YOLO zone detection settings
         self.use_yolo_zone_detection = True
         self.yolo_model_path = "W:/stage25/model/runs/detect/checkbox_optimized/weights/best.pt"
         self.yolo_confidence = 0.5
+        self.yolo_batch_size = 8           # pages per YOLO forward pass
+        self.yolo_warmup = True            # one dummy inference after loading (GUI background load, each batch/service worker)
+        self.yolo_backend = "torch"        # "torch" (ultralytics), "onnx" (ONNX Runtime) or "openvino", CPU only for the last two
+        self.yolo_int8 = False             # int8-quantized weights for the onnx/openvino backends
+        self.yolo_threads = 0              # intra-op threads for onnx/openvino, 0 = library default
+        self.yolo_imgsz = 640              # input size of the exported model
         self.zone_expansion_factor = 0.05  # Expand detected zone by 5%
+        self.multi_zone = True             # grade every detected zone (e.g. both columns), not only the best one
+        self.max_zones_per_page = 4        # keep at most this many zones per page
+        self.zone_overlap_iou = 0.5        # boxes overlapping a better one above this IoU are duplicates
         self.fallback_to_full_page = True  # If YOLO fails, process full page
+
+        # Layout cache (reuse zone + checkbox grid across copies of the same exam)
+        self.use_layout_cache = True
+        self.layout_template = ""          # exam template name, "" = one template per config
+        self.layout_min_response = 0.2     # phase-correlation peak needed to trust an alignment
+        self.layout_max_shift = 0.05       # max accepted shift (fraction of page size)
         
         # instance attributes
-        self.debug_cv: bool = True
-        self.debug_dump_n: int = 24          # dump first N checkboxes for inspection
+        self.debug_cv: bool = True            # sampled checkbox debug capture → <pdf>_debug.npz
+        self.debug_sample: str = "near_threshold"  # "first" (debug_dump_n), "rate" or "near_threshold"
+        self.debug_dump_n: int = 24           # "first": capture the boxes of the first N questions
+        self.debug_sample_rate: float = 0.01  # "rate": fraction of boxes captured at random
+        self.debug_near_margin: float = 0.02  # "near_threshold": capture when |score - min_vote_score| <= this
+        self.debug_max_samples: int = 500     # samples per archive
+        self.debug_buffer_size: int = 64      # pending samples in memory (oldest dropped when the writer lags)
         self.inner_crop_pct: float = 0.18     # % of min(w,h) trimmed on each side to skip the frame
         self.min_inner_on_ratio: float = 0.06 # ink ratio that suggests a mark is present
         self.strong_inner_on_ratio: float = 0.12
         self.edge_density_thr: float = 0.06
         self.min_vote_score: float = 0.12     # combined score threshold
+        self.cache_features: bool = True      # write <pdf>_features.npz for threshold-only re-grading
         self.use_adaptive_threshold: bool = True
 
+        # Grading service (python -m exam_manager.serve)
+        self.service_host = "127.0.0.1"    # local only by default
+        self.service_port = 8765
+        self.service_socket = ""           # Unix socket path instead of host/port ("" = TCP)
+        self.service_workers = 0           # worker processes (0 = all cores)
+        self.service_max_queue = 256       # waiting jobs before new ones are refused (HTTP 503)
+        self.service_keep_jobs = 1000      # finished jobs kept for status polling
+        self.service_upload_dir = ""       # where uploaded PDFs (and their outputs) go, "" = temp dir
+
 
     @classmethod
     def from_json(cls, json_path: str):
@@ -1,21 +1,27 @@
 from io import BytesIO
 import cv2
+import os
 from PyQt5.QtWidgets import (
     QTabWidget, QWidget, QLabel, QLineEdit, QPushButton, QMessageBox,
-    QVBoxLayout, QHBoxLayout
+    QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem, QProgressBar, QFileDialog
 )
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QPixmap
 
 
 # Local imports
 from .settings_dialog import SettingsDialog
 from .exam_config import ExamConfig, CONFIG_PATH
+from .processing_worker import PdfProcessingWorker, ModelLoaderWorker, RosterSheetsWorker
+from .review_panel import ReviewPanel
 from ..utils.key import load_key
 from ..utils.helpers import cv_to_qpixmap
 from ..utils.pdf import browse_pdf_file, convert_pdf_to_images
 from ..core.qr_encode import generate_qr
-from ..core.pdf_processing import process_pdf
 from ..core.main_yolo import YOLOZoneDetector
+from ..core.layout_cache import LayoutCache
+from ..core.result_store import ResultStore, exam_name
+from ..utils.tracing import setup_logging
 
 
 class StudentQRApp(QWidget):
@@ -24,16 +30,31 @@ class StudentQRApp(QWidget):
         self.setWindowTitle("exam manager")
         self.resize(600, 400)
         self.cfg = ExamConfig.from_json(CONFIG_PATH)
+        setup_logging(self.cfg)
 
-        # NEW: Initialize YOLO zone detector
-        self.zone_detector = YOLOZoneDetector(
-        self.cfg.yolo_model_path, 
-        self.cfg.yolo_confidence
-        )
+        # YOLO zone detector: torch + weights are loaded in the background once the window shows
+        self.zone_detector = YOLOZoneDetector.from_config(self.cfg, lazy=True)
+        self.model_loader = None
+        self.roster_worker = None  # roster sheets are composed off the GUI thread
+        self.roster_key_msg = ""
+        self.layout_cache = LayoutCache.from_config(self.cfg)
+        self.result_store = None
+
+        # grading runs on a background thread so the window stays responsive
+        self.worker = PdfProcessingWorker(self.cfg, self.zone_detector, self.layout_cache, self)
+        self.worker.pdf_started.connect(self.on_pdf_started)
+        self.worker.page_done.connect(self.on_page_done)
+        self.worker.pdf_finished.connect(self.on_pdf_finished)
+        self.worker.pdf_failed.connect(self.on_pdf_failed)
+        self.worker.pdf_cancelled.connect(self.on_pdf_cancelled)
+        self.worker.queue_empty.connect(self.on_queue_empty)
+        self.queue_items = {}
 
         self.tabs = QTabWidget()
         self.tabs.addTab(self.add_generation_tab(), "Generate QR Code")
         self.tabs.addTab(self.add_processing_tab(), "Process Exam PDF")
+        self.review_panel = ReviewPanel(self.cfg, self)
+        self.tabs.addTab(self.review_panel, "Review")
 
         layout = QVBoxLayout()
         layout.addWidget(self.tabs)
@@ -52,6 +73,9 @@ class StudentQRApp(QWidget):
         self.generate_button = QPushButton("Generate QR")
         self.generate_button.clicked.connect(self.handle_generate_qr)
 
+        self.roster_button = QPushButton("📋 Generate sheets from roster (CSV)")
+        self.roster_button.clicked.connect(self.handle_generate_roster_sheets)
+
         self.qr_label = QLabel("QR/info will appear here.")
         self.qr_label.setMinimumHeight(220)
 
@@ -64,6 +88,7 @@ class StudentQRApp(QWidget):
         layout.addWidget(self.class_input)
         layout.addWidget(self.university_input)
         layout.addWidget(self.generate_button)
+        layout.addWidget(self.roster_button)
         layout.addWidget(self.qr_label)
         tab.setLayout(layout)
         return tab
@@ -82,16 +107,49 @@ class StudentQRApp(QWidget):
         buttons_row = QHBoxLayout()
         self.process_button = QPushButton("Process PDF → Decode QR → Grade")
         self.process_button.clicked.connect(self.on_process_pdf)
+        self.cancel_button = QPushButton("⏹ Cancel")
+        self.cancel_button.clicked.connect(self.on_cancel_processing)
+        self.cancel_button.setEnabled(False)
         self.settings_button = QPushButton("⚙️ Settings")
         self.settings_button.clicked.connect(self.open_settings)
         buttons_row.addWidget(self.process_button)
+        buttons_row.addWidget(self.cancel_button)
         buttons_row.addWidget(self.settings_button)
         layout.addLayout(buttons_row)
+
+        self.queue_list = QListWidget()
+        self.queue_list.setMaximumHeight(120)
+        layout.addWidget(self.queue_list)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat("%v / %m pages")
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+        self.model_status = QLabel("")
+        layout.addWidget(self.model_status)
         layout.addWidget(self.grade_label)
 
         tab.setLayout(layout)
         return tab
 
+    # ---------- Background model loading ----------
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.model_loader is None and self.cfg.use_yolo_zone_detection:
+            # let the first paint happen before torch starts loading
+            QTimer.singleShot(0, self.start_model_loading)
+
+    def start_model_loading(self):
+        self.model_status.setText("⏳ Loading zone detector in the background…")
+        self.model_loader = ModelLoaderWorker(self.zone_detector, self.cfg.yolo_warmup, self)
+        self.model_loader.loaded.connect(self.on_model_loaded)
+        self.model_loader.start()
+
+    def on_model_loaded(self, ok: bool, seconds: float):
+        if ok:
+            self.model_status.setText(f"✅ Zone detector ready ({seconds:.1f}s)")
+        else:
+            self.model_status.setText("⚠️ YOLO model not available — check the model path in Settings")
+
     # ---------- Settings ----------
     def open_settings(self):
         dlg = SettingsDialog(self.cfg, self)
@@ -124,6 +182,32 @@ class StudentQRApp(QWidget):
         self.qr_label.setPixmap(pm)
         self.qr_label.setScaledContents(True)
 
+    def handle_generate_roster_sheets(self):
+        csv_path, _ = QFileDialog.getOpenFileName(self, "Select roster", "", "CSV Files (*.csv)")
+        if not csv_path:
+            return
+        out_pdf, _ = QFileDialog.getSaveFileName(
+            self, "Save exam sheets", os.path.splitext(csv_path)[0] + "_sheets.pdf", "PDF Files (*.pdf)")
+        if not out_pdf:
+            return
+
+        key, msg = load_key()
+        self.roster_key_msg = msg
+        self.roster_button.setEnabled(False)
+        self.qr_label.setText(f"{msg}\n⏳ Writing exam sheets to {out_pdf}…")
+        self.roster_worker = RosterSheetsWorker(csv_path, key, out_pdf, self)
+        self.roster_worker.sheets_written.connect(self.on_roster_sheets_written)
+        self.roster_worker.failed.connect(self.on_roster_failed)
+        self.roster_worker.finished.connect(lambda: self.roster_button.setEnabled(True))
+        self.roster_worker.start()
+
+    def on_roster_sheets_written(self, out_pdf: str, n_students: int):
+        self.qr_label.setText(f"{self.roster_key_msg}\n✅ {n_students} sheet(s) written to {out_pdf}")
+
+    def on_roster_failed(self, error: str):
+        self.qr_label.setText(self.roster_key_msg)
+        QMessageBox.critical(self, "Roster Error", error)
+
     # ---------- PDF handling ----------
     def on_browse_pdf(self):
         file_path = browse_pdf_file(self)  # pass self as parent so dialog is modal
@@ -138,19 +222,85 @@ class StudentQRApp(QWidget):
 
     def on_process_pdf(self):
         pdf_path = self.file_input.text().strip()
-        if not pdf_path:
+        if not pdf_path or not os.path.exists(pdf_path):
             QMessageBox.critical(self, "Error", "Please select a valid PDF file.")
             return
 
-        try:
-            summary = process_pdf(pdf_path, self.cfg, self.zone_detector, load_key())
-        except Exception as e:
-            QMessageBox.critical(self, "Processing Error", str(e))
-            return
+        # queue it; the worker picks PDFs up in order
+        item = QListWidgetItem(f"⏳ {os.path.basename(pdf_path)} — queued")
+        item.setData(Qt.UserRole, pdf_path)
+        self.queue_list.addItem(item)
+        self.queue_items.setdefault(pdf_path, []).append(item)
+        self.cancel_button.setEnabled(True)
+        self.worker.enqueue(pdf_path, load_key())
+
+    def on_cancel_processing(self):
+        self.worker.cancel()
+
+    def _queue_item(self, pdf_path: str):
+        items = self.queue_items.get(pdf_path)
+        return items[0] if items else None
+
+    def _finish_queue_item(self, pdf_path: str, text: str):
+        items = self.queue_items.get(pdf_path)
+        if items:
+            items.pop(0).setText(text)
+
+    def on_pdf_started(self, pdf_path: str):
+        item = self._queue_item(pdf_path)
+        if item is not None:
+            item.setText(f"⚙️ {os.path.basename(pdf_path)} — processing")
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+
+    def on_page_done(self, pdf_path: str, page_no: int, n_pages: int, results: list):
+        self.progress_bar.setRange(0, n_pages)
+        self.progress_bar.setValue(page_no)
+        item = self._queue_item(pdf_path)
+        if item is not None:
+            item.setText(f"⚙️ {os.path.basename(pdf_path)} — page {page_no}/{n_pages}, "
+                         f"{len(results)} question(s) on last page")
+
+    def on_pdf_failed(self, pdf_path: str, error: str):
+        self._finish_queue_item(pdf_path, f"❌ {os.path.basename(pdf_path)} — {error}")
+        QMessageBox.critical(self, "Processing Error", error)
+
+    def on_pdf_cancelled(self, pdf_path: str):
+        self._finish_queue_item(pdf_path, f"⏹ {os.path.basename(pdf_path)} — cancelled")
+
+    def on_queue_empty(self):
+        self.cancel_button.setEnabled(False)
+
+    def closeEvent(self, event):
+        # don't let Qt destroy a QThread that is still grading
+        if self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        if self.model_loader is not None and self.model_loader.isRunning():
+            # a model load cannot be interrupted, wait for it
+            self.model_loader.wait()
+        if self.roster_worker is not None and self.roster_worker.isRunning():
+            self.roster_worker.wait()
+        self.review_panel.cache.close()
+        super().closeEvent(event)
+
+    def on_pdf_finished(self, pdf_path: str, summary: dict):
+        grading = summary["grading"]
+        self._finish_queue_item(pdf_path, f"✅ {os.path.basename(pdf_path)} — "
+                                          f"{grading['score']}% ({grading['letter']})")
+
+        if self.cfg.result_store_path:
+            try:
+                if self.result_store is None or self.result_store.db_path != self.cfg.result_store_path:
+                    self.result_store = ResultStore(self.cfg.result_store_path)
+                self.result_store.save(pdf_path, summary, exam_name(self.cfg))
+            except Exception as e:
+                QMessageBox.warning(self, "Result store", f"Could not save the result: {e}")
+
+        self.review_panel.add_pdf(pdf_path, summary)
 
         # Update GUI
         validation = summary["validation"]
-        grading = summary["grading"]
         student = summary["student"]
 
         self.grade_label.setText(
@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+# Local imports
+from ..core.pdf_processing import process_pdf, ProcessingCancelled
+from ..core.qr_encode import read_roster, compose_exam_sheets
+
+
+class PdfProcessingWorker(QThread):
+    """
+    Background thread that grades queued PDFs one after the other so the Qt
+    event loop stays responsive. All results are delivered through signals,
+    which Qt queues back onto the GUI thread.
+    """
+    pdf_started = pyqtSignal(str)                       # pdf_path
+    page_done = pyqtSignal(str, int, int, list)          # pdf_path, page_no, n_pages, page results
+    pdf_finished = pyqtSignal(str, dict)                 # pdf_path, summary
+    pdf_failed = pyqtSignal(str, str)                    # pdf_path, error message
+    pdf_cancelled = pyqtSignal(str)                      # pdf_path
+    queue_empty = pyqtSignal()
+
+    def __init__(self, cfg, zone_detector, layout_cache=None, parent=None):
+        super().__init__(parent)
+        self.cfg = cfg
+        self.zone_detector = zone_detector
+        self.layout_cache = layout_cache
+        self._jobs = queue.Queue()
+        self._cancel = threading.Event()
+        # a job queued while run() was already exiting would otherwise wait for the next enqueue
+        self.finished.connect(self._restart_if_pending)
+
+    def _restart_if_pending(self):
+        if self.pending() and not self.isRunning():
+            self.start()
+
+    def enqueue(self, pdf_path: str, key):
+        self._jobs.put((pdf_path, key))
+        if not self.isRunning():
+            self.start()
+
+    def pending(self) -> int:
+        return self._jobs.qsize()
+
+    def cancel(self):
+        """Stop the PDF being processed (at the next page boundary) and drop the queue."""
+        self._cancel.set()
+        while True:
+            try:
+                pdf_path, _ = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            self.pdf_cancelled.emit(pdf_path)
+
+    def run(self):
+        while True:
+            # clear before taking the next job so a cancel() racing with it is not lost
+            self._cancel.clear()
+            try:
+                pdf_path, key = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            self.pdf_started.emit(pdf_path)
+
+            def progress(page_no, n_pages, results, pdf_path=pdf_path):
+                self.page_done.emit(pdf_path, page_no, n_pages, results)
+
+            try:
+                summary = process_pdf(
+                    pdf_path, self.cfg, self.zone_detector, key,
+                    layout_cache=self.layout_cache,
+                    progress=progress, should_cancel=self._cancel.is_set,
+                )
+            except ProcessingCancelled:
+                self.pdf_cancelled.emit(pdf_path)
+                continue
+            except Exception as e:
+                self.pdf_failed.emit(pdf_path, f"{os.path.basename(pdf_path)}: {e}")
+                continue
+            self.pdf_finished.emit(pdf_path, summary)
+        self.queue_empty.emit()
+
+
+class ModelLoaderWorker(QThread):
+    """
+    Loads (and warms up) a lazy YOLOZoneDetector off the GUI thread once the
+    window is visible. A PDF queued meanwhile simply waits in is_available().
+    """
+    loaded = pyqtSignal(bool, float)                     # model available, seconds
+
+    def __init__(self, zone_detector, warmup: bool = True, parent=None):
+        super().__init__(parent)
+        self.zone_detector = zone_detector
+        self.warmup = warmup
+
+    def run(self):
+        t0 = time.perf_counter()
+        ok = self.zone_detector.load(warmup=self.warmup)
+        self.loaded.emit(ok, time.perf_counter() - t0)
+
+
+class RosterSheetsWorker(QThread):
+    """
+    Reads a CSV roster and composes the print-ready exam sheets off the GUI thread
+    (QR encryption and PDF writing take seconds for a large class).
+    """
+    sheets_written = pyqtSignal(str, int)                # out_pdf, number of students
+    failed = pyqtSignal(str)                             # error message
+
+    def __init__(self, csv_path: str, key, out_pdf: str, parent=None):
+        super().__init__(parent)
+        self.csv_path = csv_path
+        self.key = key
+        self.out_pdf = out_pdf
+
+    def run(self):
+        try:
+            students = read_roster(self.csv_path)
+            compose_exam_sheets(students, self.key, self.out_pdf)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.sheets_written.emit(self.out_pdf, len(students))
@@ -0,0 +1,159 @@
+import glob
+import os
+import re
+
+import cv2
+from PyQt5.QtWidgets import (
+    QWidget, QLabel, QPushButton, QListWidget, QListWidgetItem, QVBoxLayout, QHBoxLayout,
+    QSplitter, QFileDialog, QSizePolicy
+)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QPixmap
+
+
+# Local imports
+from .exam_config import ExamConfig
+from ..utils.helpers import cv_to_qimage
+from ..utils.image_cache import ImageCache
+from ..core.visualization import visualize_page
+
+
+_VIS_NAME = re.compile(r"page_(\d+)_vis\.\w+$")
+
+
+class ReviewPanel(QWidget):
+    """
+    Flip through the graded pages with their overlays (page_<n>_vis.* files, or
+    rendered on demand from the cached features). Decoded pages live in a
+    memory-capped LRU cache, the next pages are prefetched in the background and
+    frames go to the screen as QImages over the NumPy buffer (no encode/decode).
+    """
+
+    def __init__(self, cfg: ExamConfig, parent=None):
+        super().__init__(parent)
+        self.cfg = cfg
+        self.pages = []          # [(label, source)], source = vis file path or (pdf_path, page_no)
+        self.index = -1
+        self.cache = ImageCache(self._load, max_bytes=cfg.review_cache_mb * 2**20)
+
+        self.page_list = QListWidget()
+        self.page_list.currentRowChanged.connect(self.show_page)
+
+        self.view = QLabel("Graded pages will appear here.")
+        self.view.setAlignment(Qt.AlignCenter)
+        self.view.setMinimumSize(300, 300)
+        self.view.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+
+        self.prev_button = QPushButton("◀ Previous")
+        self.prev_button.clicked.connect(lambda: self.step(-1))
+        self.next_button = QPushButton("Next ▶")
+        self.next_button.clicked.connect(lambda: self.step(1))
+        self.open_button = QPushButton("📂 Open results folder")
+        self.open_button.clicked.connect(self.on_open_folder)
+        self.status = QLabel("")
+
+        # coalesce resize events: rescale once the window stops moving
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(50)
+        self._resize_timer.timeout.connect(self._refresh)
+
+        nav = QHBoxLayout()
+        nav.addWidget(self.prev_button)
+        nav.addWidget(self.next_button)
+        nav.addWidget(self.open_button)
+        nav.addWidget(self.status, 1)
+
+        split = QSplitter(Qt.Horizontal)
+        split.addWidget(self.page_list)
+        split.addWidget(self.view)
+        split.setStretchFactor(1, 4)
+
+        layout = QVBoxLayout()
+        layout.addWidget(split, 1)
+        layout.addLayout(nav)
+        self.setLayout(layout)
+
+    # ---------- sources ----------
+    def add_pdf(self, pdf_path: str, summary: dict):
+        """Queue the pages of a graded PDF (its visualization files, or on-demand renders)."""
+        name = summary.get("student", {}).get("name") or os.path.basename(pdf_path)
+        vis = {int(m.group(1)): p for p in summary.get("visualizations", [])
+               for m in [_VIS_NAME.search(p)] if m}
+        for page in summary.get("pages", []):
+            page_no = page["page"]
+            self._append(f"{name} — page {page_no}", vis.get(page_no, (pdf_path, page_no)))
+
+    def add_folder(self, folder: str):
+        files = glob.glob(os.path.join(folder, "**", "*_pages", "page_*_vis.*"), recursive=True)
+
+        def order(path):
+            m = _VIS_NAME.search(path)
+            return os.path.dirname(path), int(m.group(1)) if m else 0
+
+        for path in sorted(files, key=order):
+            pdf = os.path.basename(os.path.dirname(path))[:-len("_pages")]
+            self._append(f"{pdf} — page {order(path)[1]}", path)
+
+    def _append(self, label: str, source):
+        self.pages.append((label, source))
+        self.page_list.addItem(QListWidgetItem(label))
+        if self.index < 0:
+            self.page_list.setCurrentRow(0)
+
+    def clear(self):
+        self.pages.clear()
+        self.page_list.clear()
+        self.cache.clear()
+        self.index = -1
+
+    def _load(self, source):
+        # runs on the prefetch thread: NumPy only, no Qt objects
+        if isinstance(source, str):
+            return cv2.imread(source, cv2.IMREAD_COLOR)
+        return visualize_page(source[0], source[1], self.cfg)
+
+    # ---------- navigation ----------
+    def step(self, delta: int):
+        if self.pages:
+            self.page_list.setCurrentRow(min(max(0, self.index + delta), len(self.pages) - 1))
+
+    def show_page(self, row: int):
+        if not 0 <= row < len(self.pages):
+            return
+        self.index = row
+        self._refresh()
+        # keep the next pages (and the previous one) decoded ahead of the reviewer
+        ahead = range(row + 1, min(len(self.pages), row + 1 + self.cfg.review_prefetch))
+        self.cache.prefetch([self.pages[i][1] for i in (*ahead, row - 1) if 0 <= i < len(self.pages)])
+
+    def _refresh(self):
+        if not 0 <= self.index < len(self.pages):
+            return
+        label, source = self.pages[self.index]
+        image = self.cache.get(source)
+        if image is None:
+            self.view.setText(f"{label}: no visualization available")
+            return
+        pixmap = QPixmap.fromImage(cv_to_qimage(image))
+        self.view.setPixmap(pixmap.scaled(self.view.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        self.status.setText(f"{self.index + 1}/{len(self.pages)} — {label} "
+                            f"(cache {len(self.cache)} pages, {self.cache.nbytes / 2**20:.0f} MB)")
+
+    def on_open_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Folder with graded PDFs")
+        if folder:
+            self.add_folder(folder)
+
+    # ---------- events ----------
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Right, Qt.Key_PageDown, Qt.Key_Space):
+            self.step(1)
+        elif event.key() in (Qt.Key_Left, Qt.Key_PageUp):
+            self.step(-1)
+        else:
+            super().keyPressEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._resize_timer.start()
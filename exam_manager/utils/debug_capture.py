@@ -0,0 +1,154 @@
+import contextlib
+import contextvars
+import io
+import json
+import logging
+import os
+import random
+import threading
+import zipfile
+from collections import deque
+
+import numpy as np
+
+from exam_manager.utils.tracing import current_attrs, span
+
+
+SAMPLE_MODES = ("first", "rate", "near_threshold")
+
+# Capture of the PDF being processed in this thread/context (None = debug capture off)
+_current_capture = contextvars.ContextVar("exam_debug_capture", default=None)
+
+
+def debug_path(pdf_path: str) -> str:
+    return os.path.splitext(pdf_path)[0] + "_debug.npz"
+
+
+def current_capture():
+    return _current_capture.get()
+
+
+class DebugCapture:
+    """
+    Sampled checkbox debug capture. process_checkbox_rows asks wants() for every box
+    (a counter, RNG or score test); only the sampled boxes have their intermediate
+    images copied into a bounded ring buffer, from which a background thread appends
+    them to one compressed archive per run: <pdf>_debug.npz, one .npy per image plus
+    an index.json with the numbers of every sample. When the writer falls behind,
+    the oldest pending samples are dropped instead of blocking the grading path.
+    """
+
+    def __init__(self, path: str, mode: str = "near_threshold", first_n: int = 24, rate: float = 0.01,
+                 threshold: float = 0.12, margin: float = 0.02, max_samples: int = 500, buffer_size: int = 64):
+        if mode not in SAMPLE_MODES:
+            raise ValueError(f"Unknown debug_sample {mode!r}, expected one of {SAMPLE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.first_n = first_n
+        self.rate = rate
+        self.threshold = threshold
+        self.margin = margin
+        self.max_samples = max_samples
+        self.taken = self.dropped = self.written = 0
+        self._rng = random.Random()
+        self._buffer = deque(maxlen=max(1, buffer_size))
+        self._cond = threading.Condition()
+        self._closed = False
+        self._index = []
+        self._thread = None  # started with the first sample: no thread, no file when nothing is sampled
+
+    @classmethod
+    def from_config(cls, cfg, pdf_path: str):
+        """Capture for one PDF, or None when cfg.debug_cv is off."""
+        if not cfg.debug_cv:
+            return None
+        return cls(debug_path(pdf_path), mode=cfg.debug_sample, first_n=cfg.debug_dump_n,
+                   rate=cfg.debug_sample_rate, threshold=cfg.min_vote_score, margin=cfg.debug_near_margin,
+                   max_samples=cfg.debug_max_samples, buffer_size=cfg.debug_buffer_size)
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Make this the capture of the current context; the archive is finished on exit."""
+        tok = _current_capture.set(self)
+        try:
+            yield self
+        finally:
+            _current_capture.reset(tok)
+            self.close()
+
+    def wants(self, q_idx: int, score: float) -> bool:
+        """Sampling decision for one box, taken before any image is kept."""
+        if self.taken >= self.max_samples:
+            return False
+        if self.mode == "first":
+            return q_idx <= self.first_n
+        if self.mode == "rate":
+            return self._rng.random() < self.rate
+        return abs(score - self.threshold) <= self.margin
+
+    def add(self, meta: dict, imgs: dict):
+        """Queue one sample; the images are copied so the caller's buffers can be released."""
+        imgs = {name: np.array(img, copy=True) for name, img in imgs.items() if isinstance(img, np.ndarray)}
+        with self._cond:
+            if self._closed or self.taken >= self.max_samples:
+                return
+            self.taken += 1
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(({**current_attrs(), **meta, "id": self.taken}, imgs))
+            if self._thread is None:
+                self._thread = threading.Thread(target=contextvars.copy_context().run, args=(self._run,),
+                                                name="debug-capture", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        with zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            while True:
+                with self._cond:
+                    while not self._buffer and not self._closed:
+                        self._cond.wait()
+                    if not self._buffer:
+                        break
+                    meta, imgs = self._buffer.popleft()
+                try:
+                    with span("debug_write"):
+                        self._write(archive, meta, imgs)
+                except Exception as e:
+                    logging.error(f"Debug capture {self.path} failed: {e}")
+            meta = {"mode": self.mode, "taken": self.taken, "dropped": self.dropped, "samples": self._index}
+            archive.writestr("index.json", json.dumps(meta, indent=1))
+
+    def _write(self, archive: zipfile.ZipFile, meta: dict, imgs: dict):
+        prefix = f"s{meta['id']:05d}"
+        meta["images"] = []
+        for name, img in imgs.items():
+            buf = io.BytesIO()
+            np.lib.format.write_array(buf, img, allow_pickle=False)
+            archive.writestr(f"{prefix}_{name}.npy", buf.getvalue())
+            meta["images"].append(f"{prefix}_{name}")
+        self._index.append(meta)
+        self.written += 1
+
+    def close(self) -> str | None:
+        """Flush the pending samples and finish the archive. Returns its path (None if nothing was sampled)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is None:
+            return None
+        self._thread.join()
+        if self.dropped:
+            logging.warning(f"Debug capture dropped {self.dropped} of {self.taken} samples (writer behind)")
+        return self.path
+
+
+def load_debug_archive(path: str) -> list:
+    """
+    Samples of a <pdf>_debug.npz as [(meta, {image name: array})], meta holding
+    q/option/x/y/w/h/inner_ratio/edge_ratio/score/checked (+ page when known).
+    """
+    with np.load(path) as npz:
+        index = json.loads(bytes(npz["index.json"]).decode("utf-8"))
+        return [(meta, {name.split("_", 1)[1]: npz[name] for name in meta.pop("images")})
+                for meta in index["samples"]]
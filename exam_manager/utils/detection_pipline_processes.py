@@ -1,14 +1,27 @@
 import cv2
+import logging
 import numpy as np
 
 from exam_manager.ui.exam_config import ExamConfig
+from exam_manager.utils.helpers import to_gray
+from exam_manager.utils.debug_capture import current_capture
 
-def process_checkbox_rows(rows: list, zone_image: np.ndarray, cfg: ExamConfig, q_start_index: int) -> list:
+def process_checkbox_rows(rows: list, zone_image: np.ndarray, cfg: ExamConfig, q_start_index: int,
+                          features_out: dict | None = None) -> list:
+    """
+    Score every box of every row and pick one answer per row (question).
+    When `features_out` is a dict, the threshold-independent features of each box
+    (question, option, geometry, inner_ratio, edge_ratio, valid) are appended to it
+    as lists, so the page can later be re-graded with apply_checkbox_features.
+    """
     results = []
     labels = cfg.option_labels
     if len(labels) != cfg.options_per_question:
         labels = [f"opt_{i}" for i in range(cfg.options_per_question)]
 
+    # sampled debug capture of the current PDF (None when cfg.debug_cv is off)
+    capture = current_capture()
+
     q_idx = q_start_index
     for row in rows:
         # keep only expected options
@@ -22,11 +35,20 @@ def process_checkbox_rows(rows: list, zone_image: np.ndarray, cfg: ExamConfig, q
             roi = zone_image[y:y+h, x:x+w]
             checked, score, dbg = score_checkbox_robust(roi, cfg)
 
-            if cfg.debug_cv and q_idx <= cfg.debug_dump_n:
-                prefix = f"dbg/Q{q_idx:02d}_{labels[j]}_{x}-{y}-{w}x{h}"
-                imgs = dbg.get("imgs", {})
-                _dump_checkbox_debug(prefix, imgs)
-                print(f"[DBG][Q{q_idx} {labels[j]}] wh=({w}x{h}) "
+            if features_out is not None:
+                for name, value in (("question", q_idx), ("option", j), ("x", x), ("y", y), ("w", w), ("h", h),
+                                    ("inner_ratio", dbg.get("inner_ratio", 0.0)),
+                                    ("edge_ratio", dbg.get("edge_ratio", 0.0)),
+                                    ("valid", "err" not in dbg)):
+                    features_out.setdefault(name, []).append(value)
+
+            if capture is not None and capture.wants(q_idx, score):
+                # intermediate images are only built for the sampled boxes
+                imgs = score_checkbox_robust(roi, cfg, keep_images=True)[2].get("imgs", {})
+                capture.add({"q": q_idx, "option": labels[j], "x": x, "y": y, "w": w, "h": h,
+                             "inner_ratio": dbg.get("inner_ratio", -1.0), "edge_ratio": dbg.get("edge_ratio", -1.0),
+                             "score": score, "checked": bool(checked)}, imgs)
+                logging.debug(f"Q{q_idx} {labels[j]}: wh=({w}x{h}) "
                       f"inner={dbg.get('inner_ratio',-1):.3f} "
                       f"edge={dbg.get('edge_ratio',-1):.3f} "
                       f"score={dbg.get('score',-1):.3f} checked={checked}")
@@ -45,28 +67,52 @@ def process_checkbox_rows(rows: list, zone_image: np.ndarray, cfg: ExamConfig, q
     return results
 
 
-def _dump_checkbox_debug(prefix: str, img_dict: dict):
-    # Saves a few stages to disk when debugging
-    try:
-        for k, v in img_dict.items():
-            if isinstance(v, np.ndarray):
-                cv2.imwrite(f"{prefix}_{k}.png", v)
-    except Exception:
-        pass
+def apply_checkbox_features(features: dict, cfg: ExamConfig) -> list:
+    """
+    Re-run the per-question decision of process_checkbox_rows on stored features
+    (arrays as filled through features_out), without touching any image.
+    Thresholds and option_labels come from `cfg`; the boxes themselves are fixed.
+    """
+    question = np.asarray(features.get("question", []), dtype=np.int64)
+    if question.size == 0:
+        return []
+    option = np.asarray(features["option"], dtype=np.int64)
+    checked, score = checkbox_decision(features["inner_ratio"], features["edge_ratio"], cfg)
+    valid = np.asarray(features["valid"], dtype=bool)
+    checked = checked & valid
+    score = np.where(valid, score, 0.0)
+
+    labels = cfg.option_labels
+    if len(labels) != cfg.options_per_question:
+        labels = [f"opt_{i}" for i in range(cfg.options_per_question)]
+
+    # one row per question, one column per option; argmax keeps the first best option like the row loop
+    q_ids, q_row = np.unique(question, return_inverse=True)
+    grid = np.full((q_ids.size, int(option.max()) + 1), -np.inf)
+    grid[q_row, option] = score
+    best = grid.argmax(axis=1)
+    best_checked = np.zeros_like(grid, dtype=bool)
+    best_checked[q_row, option] = checked
+    best_checked = best_checked[np.arange(q_ids.size), best]
+
+    return [
+        {"question": int(q), "grade": labels[int(o)] if c and int(o) < len(labels) else "missing"}
+        for q, o, c in zip(q_ids, best, best_checked)
+    ]
 
 
-def score_checkbox_robust(roi_bgr: np.ndarray, cfg) -> tuple[bool, float, dict]:
+def score_checkbox_robust(roi_bgr: np.ndarray, cfg, keep_images: bool = False) -> tuple[bool, float, dict]:
     """
     Returns (is_checked, score, dbg)
     - score ~ inner_ink_ratio*1.0 + edge_density*0.5 (clamped to [0,1])
     - dbg contains all intermediate numbers for logging
+      (and the intermediate images under "imgs" with keep_images)
     """
-    dbg = {}
     if roi_bgr is None or roi_bgr.size == 0:
         return False, 0.0, {"err": "empty_roi"}
 
     # --- grayscale & denoise
-    gray = cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2GRAY)
+    gray = to_gray(roi_bgr)
     blur = cv2.GaussianBlur(gray, (3, 3), 0)
 
     # --- binarize (invert so "ink" is white=255)
@@ -98,48 +144,124 @@ def score_checkbox_robust(roi_bgr: np.ndarray, cfg) -> tuple[bool, float, dict]:
     edge_ratio = float(np.count_nonzero(edges > 0)) / float(edges.size)
 
     # --- decision
-    # Strong positive if there’s a lot of ink inside.
-    strong = inner_ratio >= cfg.strong_inner_on_ratio
-    # Otherwise combine ink + edges
-    score = max(0.0, min(1.0, inner_ratio * 1.0 + edge_ratio * 0.5))
-    weak = (inner_ratio >= cfg.min_inner_on_ratio and edge_ratio >= cfg.edge_density_thr)
-    is_checked = bool(strong or (score >= cfg.min_vote_score) or weak)
+    is_checked, score = checkbox_decision(inner_ratio, edge_ratio, cfg)
+    is_checked, score = bool(is_checked), float(score)
 
     # --- debug pack
-    dbg.update(dict(
+    dbg = dict(
         w=w, h=h, pad=pad,
         inner_ratio=inner_ratio, edge_ratio=edge_ratio, score=score,
-    ))
-    if getattr(cfg, "debug_cv", False):
-        dbg_imgs = {
-            "roi": roi_bgr,
-            "gray": gray,
-            "th_otsu": th_otsu,
-            "th": th,
-            "inner": inner,
-            "inner_clean": inner_clean,
-            "edges": edges,
-        }
-        dbg["imgs"] = dbg_imgs
+    )
+    if keep_images:
+        dbg["imgs"] = {"roi": roi_bgr, "gray": gray, "th_otsu": th_otsu, "th": th,
+                       "inner": inner, "inner_clean": inner_clean, "edges": edges}
     return is_checked, score, dbg
 
+def checkbox_decision(inner_ratio, edge_ratio, cfg):
+    """
+    Shared checked/score rule. Works on scalars or NumPy arrays of features.
+    Returns (is_checked, score).
+    """
+    inner_ratio = np.asarray(inner_ratio, dtype=np.float64)
+    edge_ratio = np.asarray(edge_ratio, dtype=np.float64)
+    # Strong positive if there’s a lot of ink inside.
+    strong = inner_ratio >= cfg.strong_inner_on_ratio
+    # Otherwise combine ink + edges
+    score = np.clip(inner_ratio * 1.0 + edge_ratio * 0.5, 0.0, 1.0)
+    weak = (inner_ratio >= cfg.min_inner_on_ratio) & (edge_ratio >= cfg.edge_density_thr)
+    is_checked = strong | (score >= cfg.min_vote_score) | weak
+    return is_checked, score
+
+
+def _contour_rects(contours) -> np.ndarray:
+    """
+    cv2.boundingRect of every contour at once: one concatenate + min/max reduceat
+    instead of a Python-level call per contour. Returns an (n, 4) int array of x, y, w, h.
+    """
+    if len(contours) == 0:
+        return np.zeros((0, 4), dtype=np.int64)
+    lens = np.fromiter((len(c) for c in contours), dtype=np.intp, count=len(contours))
+    pts = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    starts = np.zeros(len(lens), dtype=np.intp)
+    np.cumsum(lens[:-1], out=starts[1:])
+    mins = np.minimum.reduceat(pts, starts, axis=0)
+    maxs = np.maximum.reduceat(pts, starts, axis=0)
+    return np.hstack([mins, maxs - mins + 1])
+
+
+def _drop_small_components(bw: np.ndarray, min_size: int) -> np.ndarray | None:
+    """
+    On speckled scans RETR_TREE returns tens of thousands of contours, and building
+    them dominates the page time. Every contour (outer or hole) lies inside the
+    bounding box of its connected component, so components narrower or shorter than
+    `min_size` can never produce a candidate and are removed before the contour pass.
+    Returns the cleaned mask, or None when the page is not speckled enough to pay
+    for the labelling (judged on contours in a horizontal strip through the middle).
+    """
+    h = bw.shape[0]
+    strip = bw[h * 7 // 16: h * 9 // 16]
+    probe, _ = cv2.findContours(strip, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if len(probe) * 8 < 4000:
+        return None
+
+    n, labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(bw, 8, cv2.CV_32S, cv2.CCL_BBDT)
+    keep = (stats[:, cv2.CC_STAT_WIDTH] >= min_size) & (stats[:, cv2.CC_STAT_HEIGHT] >= min_size)
+    keep[0] = False  # background
+    ids = np.flatnonzero(keep)
+    if len(ids) > 256:
+        lut = np.where(keep, 255, 0).astype(np.uint8)
+        return lut[labels]
+    mask = np.zeros_like(bw)
+    for k in ids:
+        x, y, w, hh = stats[k, :4]
+        sub = mask[y:y + hh, x:x + w]
+        sub[labels[y:y + hh, x:x + w] == k] = 255
+    return mask
+
+
+def _dedupe_nested_boxes(boxes: list, max_offset: int = 5) -> list:
+    """
+    Drop a box when an already kept box starts less than `max_offset` px away
+    (in x and y) and is larger, i.e. the inner edge of a checkbox frame.
+    Boxes are swept in (y, x) order and only the kept boxes of the last
+    `max_offset` rows are compared, instead of every kept box.
+    """
+    kept = []
+    window_start = 0
+    for (x, y, w, h) in sorted(boxes, key=lambda b: (b[1], b[0])):  # sort by y, then x
+        # kept boxes are in y order; anything max_offset rows above can no longer match
+        while window_start < len(kept) and kept[window_start][1] <= y - max_offset:
+            window_start += 1
+        too_close = False
+        for (fx, fy, fw, fh) in kept[window_start:]:
+            if abs(x - fx) < max_offset and w * h < fw * fh:
+                # smaller box inside bigger box, skip it
+                too_close = True
+                break
+        if not too_close:
+            kept.append((x, y, w, h))
+    return kept
+
+
 def find_shapes_in_zone(zone_bgr: np.ndarray, cfg: ExamConfig) -> list:
-    gray = cv2.cvtColor(zone_bgr, cv2.COLOR_BGR2GRAY)
+    gray = to_gray(zone_bgr)
     blur = cv2.GaussianBlur(gray, (3, 3), 0)
     _, bw = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
 
+    cleaned = _drop_small_components(bw, 15)
+    if cleaned is not None:
+        bw = cleaned
     contours, _ = cv2.findContours(bw, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    logging.debug(f"Total contours found: {len(contours)}")
 
-    boxes = []
-
-
-    print(f"[DEBUG] Total contours found: {len(contours)}")
-    for i, cnt in enumerate(contours):
-        x, y, w, h = cv2.boundingRect(cnt)
+    # size gate on all bounding boxes at once; text and specks never reach the shape tests
+    rects = _contour_rects(contours)
+    size_ok = ((rects[:, 2] >= 15) & (rects[:, 3] >= 15) & (rects[:, 2] <= 60) & (rects[:, 3] <= 60))
 
-        #if w < 5 or h < 5:
-        if w < 15 or h < 15 or w > 60 or h > 60:
-            continue
+    boxes = []
+    for i in np.flatnonzero(size_ok):
+        cnt = contours[i]
+        x, y, w, h = (int(v) for v in rects[i])
 
         peri = cv2.arcLength(cnt, True)
         approx = cv2.approxPolyDP(cnt, 0.04 * peri, True)
@@ -155,26 +277,7 @@ def find_shapes_in_zone(zone_bgr: np.ndarray, cfg: ExamConfig) -> list:
         if keep:
             boxes.append((x, y, w, h))
 
-
-    boxes.sort(key=lambda b: (b[1], b[0]))
-
-
-
-    filtered_boxes = []
-    boxes_sorted = sorted(boxes, key=lambda b: (b[1], b[0]))  # sort by y, then x
-
-    for (x,y,w,h) in boxes_sorted:
-        too_close = False
-        for (fx,fy,fw,fh) in filtered_boxes:
-            if abs(x-fx) < 5 and abs(y-fy) < 5:
-                # smaller box inside bigger box, skip it
-                if w*h < fw*fh:
-                    too_close = True
-        if not too_close:
-            filtered_boxes.append((x,y,w,h))
-
-
-    return filtered_boxes
+    return _dedupe_nested_boxes(boxes)
 
 
 def group_shapes_into_questions(candidates: list, cfg: ExamConfig) -> list:
@@ -1,27 +1,59 @@
 import cv2
 import numpy as np
 from PIL import Image
-from PyQt5.QtGui import QPixmap
-from io import BytesIO
+from PyQt5.QtGui import QImage, QPixmap
 
 def pil_to_cv(img_pil: Image.Image) -> np.ndarray:
     return cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
 
+def to_gray(img: np.ndarray) -> np.ndarray:
+    # pages may be rasterized as single-channel already
+    if img.ndim == 2:
+        return img
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def to_bgr(img: np.ndarray) -> np.ndarray:
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img
+
+def cv_to_qimage(img_cv: np.ndarray) -> QImage:
+    """
+    Wrap a BGR or grayscale uint8 array as a QImage without copying or encoding.
+    The QImage points into the array's buffer, which it keeps alive.
+    """
+    img = np.ascontiguousarray(img_cv)
+    h, w = img.shape[:2]
+    fmt = QImage.Format_Grayscale8 if img.ndim == 2 else QImage.Format_BGR888
+    qimg = QImage(img.data, w, h, img.strides[0], fmt)
+    qimg._buffer = img  # QImage does not own the memory
+    return qimg
+
 def cv_to_qpixmap(img_cv: np.ndarray) -> QPixmap:
-    rgb = cv2.cvtColor(img_cv, cv2.COLOR_BGR2RGB)
-    pil_img = Image.fromarray(rgb)
-    buf = BytesIO()
-    pil_img.save(buf, format="PNG")
-    buf.seek(0)
-    pm = QPixmap()
-    pm.loadFromData(buf.read())
-    return pm
-
-
-
-def crop_qr_region(page_bgr: np.ndarray) -> np.ndarray:
-    # assume QR always in top-right corner
-    x, y, w, h = 1363, 78, 217, 217
-    qr_crop = page_bgr[y:y+h, x:x+w]
-    cv2.imwrite("debug_qr_crop.png", qr_crop)  # debug save
+    # one pixel conversion into the pixmap, no PNG round-trip
+    return QPixmap.fromImage(cv_to_qimage(img_cv))
+
+
+
+# QR position on the reference A4 page rendered at 200 dpi (1654 px wide)
+QR_DEFAULT_REGION = (1363, 78, 217, 217)
+QR_REFERENCE_WIDTH = 1654
+
+def crop_qr_region(page_bgr: np.ndarray, region: tuple | None = None, margin: float = 0.0,
+                   debug_path: str | None = None) -> np.ndarray:
+    # assume QR always in top-right corner unless a region is configured
+    x, y, w, h = region or QR_DEFAULT_REGION
+
+    # region is given for the reference width, follow the rasterization DPI
+    scale = page_bgr.shape[1] / float(QR_REFERENCE_WIDTH)
+    x, y, w, h = (int(round(v * scale)) for v in (x, y, w, h))
+
+    # widen by `margin` × size on every side (clamped to the page)
+    dx, dy = int(w * margin), int(h * margin)
+    img_h, img_w = page_bgr.shape[:2]
+    x0, y0 = max(0, x - dx), max(0, y - dy)
+    x1, y1 = min(img_w, x + w + dx), min(img_h, y + h + dy)
+    qr_crop = page_bgr[y0:y1, x0:x1]
+    if debug_path:
+        cv2.imwrite(debug_path, qr_crop)  # debug save
     return qr_crop
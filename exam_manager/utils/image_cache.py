@@ -0,0 +1,103 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class ImageCache:
+    """
+    Thread-safe LRU cache of decoded images (NumPy arrays) capped by memory
+    (sum of nbytes), with background prefetching through a small thread pool.
+    `loader(key) -> np.ndarray | None` decodes/renders one image; it runs on the
+    pool for prefetches and on the caller's thread for a miss in get(). A loader
+    error (e.g. a PDF moved since the run) is logged and the image is None.
+    """
+
+    def __init__(self, loader, max_bytes: int = 256 * 2**20, workers: int = 1):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-cache")
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key) -> np.ndarray | None:
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+            pending = self._pending.get(key)
+        # already being prefetched: wait for it instead of decoding twice
+        image = None
+        if pending is not None:
+            try:
+                image = pending.result()
+            except Exception:
+                pending = None  # cancelled by close(): load it here
+        if pending is None:
+            image = self._call_loader(key)
+        self.put(key, image)
+        return image
+
+    def put(self, key, image: np.ndarray | None):
+        if image is None or image.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._items[key] = image
+            self._bytes += image.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def prefetch(self, keys):
+        """Load `keys` in the background (skipping cached and in-flight ones), in order."""
+        with self._lock:
+            todo = [k for k in keys if k not in self._items and k not in self._pending]
+            for key in todo:
+                self._pending[key] = self._pool.submit(self._load, key)
+
+    def _call_loader(self, key) -> np.ndarray | None:
+        try:
+            return self.loader(key)
+        except Exception as e:
+            logging.error(f"Image cache: could not load {key} ({type(e).__name__}: {e})")
+            return None
+
+    def _load(self, key):
+        try:
+            image = self._call_loader(key)
+            self.put(key, image)
+            return image
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,8 @@
 import os
 import tempfile
+import cv2
+import numpy as np
 from PyQt5.QtWidgets import QFileDialog
-from pdf2image import convert_from_path
 
 
 def browse_pdf_file(parent_widget=None) -> str | None:
@@ -9,9 +10,49 @@ def browse_pdf_file(parent_widget=None) -> str | None:
     if file_path:
         return file_path if file_path else None
 
-def convert_pdf_to_images(pdf_path: str) -> list:
-    pages_pil = convert_from_path(pdf_path)
-    out_dir = tempfile.mkdtemp(prefix="exam_pages_")
+def rasterize_pdf(pdf_path: str, dpi: int = 200, grayscale: bool = False) -> list[np.ndarray]:
+    """
+    Render every page straight to NumPy arrays (BGR, or single-channel when
+    `grayscale` is set) without writing anything to disk.
+    """
+    from pdf2image import convert_from_path  # imported on first use, keeps GUI startup light
+    pages_pil = convert_from_path(pdf_path, dpi=dpi, grayscale=grayscale)
+    pages = []
+    while pages_pil:
+        img = pages_pil.pop(0)
+        arr = np.array(img)
+        if not grayscale:
+            arr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+        pages.append(arr)
+        img.close()
+    return pages
+
+def pdf_page_count(pdf_path: str) -> int:
+    from pdf2image import pdfinfo_from_path
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+def render_pdf_page(pdf_path: str, page_no: int, dpi: int = 200, grayscale: bool = False) -> np.ndarray:
+    """
+    Render a single page (1-based) to a NumPy array, like rasterize_pdf but with
+    only that page in memory, so callers can stream long scans page by page.
+    """
+    from pdf2image import convert_from_path
+    img = convert_from_path(pdf_path, dpi=dpi, grayscale=grayscale, first_page=page_no, last_page=page_no)[0]
+    arr = np.array(img)
+    img.close()
+    return arr if grayscale else cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+
+def convert_pdf_to_images(pdf_path: str, dpi: int = 200, out_dir: str | None = None) -> list:
+    """
+    Render every page to a PNG on disk and return the file paths.
+    Only used when page images are explicitly requested; see rasterize_pdf otherwise.
+    """
+    from pdf2image import convert_from_path
+    pages_pil = convert_from_path(pdf_path, dpi=dpi)
+    if out_dir is None:
+        out_dir = tempfile.mkdtemp(prefix="exam_pages_")
+    else:
+        os.makedirs(out_dir, exist_ok=True)
     image_paths = []
     for i, img in enumerate(pages_pil, start=1):
         path = os.path.join(out_dir, f"page_{i}.png")
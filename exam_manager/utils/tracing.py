@@ -0,0 +1,185 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+
+# Tracer of the PDF being processed in this thread/context (None = tracing off)
+_current_tracer = contextvars.ContextVar("exam_tracer", default=None)
+# Attributes (pdf, page, ...) attached to every span opened in this context
+_current_attrs = contextvars.ContextVar("exam_trace_attrs", default={})
+
+log = logging.getLogger("exam_manager.trace")
+
+
+class Tracer:
+    """
+    Collects timing spans for the grading pipeline. Spans are opened with the
+    module-level span() helper, so stage functions do not need a tracer argument:
+    process_pdf activates a tracer for the duration of one PDF and every span
+    opened below it (rasterize, deskew, qr, yolo, contours, scoring, grading,
+    json_write) is recorded with the current pdf/page attributes.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def record(self, name: str, start: float, duration: float, attrs: dict):
+        entry = {
+            "name": name,
+            "start_ms": round((start - self._t0) * 1000.0, 3),
+            "duration_ms": round(duration * 1000.0, 3),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            **attrs,
+        }
+        with self._lock:
+            self.spans.append(entry)
+        log.debug(f"{name}: {entry['duration_ms']:.1f} ms", extra={"span": entry})
+
+    @contextlib.contextmanager
+    def activate(self, **attrs):
+        """Make this the tracer used by span() in the current context."""
+        tok_tracer = _current_tracer.set(self)
+        tok_attrs = _current_attrs.set({**_current_attrs.get(), **attrs})
+        try:
+            yield self
+        finally:
+            _current_attrs.reset(tok_attrs)
+            _current_tracer.reset(tok_tracer)
+
+    def durations(self) -> dict:
+        """{stage: [duration_ms, ...]}"""
+        out = {}
+        for s in self.spans:
+            out.setdefault(s["name"], []).append(s["duration_ms"])
+        return out
+
+    def summary(self) -> dict:
+        return summarize_durations(self.durations())
+
+    def to_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"spans": self.spans, "summary": self.summary()}, indent=2, ensure_ascii=False))
+
+    def to_chrome_trace(self, path: str):
+        """Write the spans in Chrome trace format (chrome://tracing, Perfetto)."""
+        events = []
+        for s in self.spans:
+            args = {k: v for k, v in s.items() if k not in ("name", "start_ms", "duration_ms", "pid", "tid")}
+            events.append({
+                "name": s["name"], "ph": "X", "cat": "grading",
+                "ts": s["start_ms"] * 1000.0, "dur": s["duration_ms"] * 1000.0,
+                "pid": s["pid"], "tid": s["tid"], "args": args,
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+    def export(self, path: str, fmt: str = "json"):
+        if fmt == "chrome":
+            self.to_chrome_trace(path)
+        else:
+            self.to_json(path)
+
+
+def summarize_durations(durations: dict) -> dict:
+    """
+    Per-stage count/total/mean/p50/p95/max (ms) from {stage: [duration_ms, ...]}.
+    Used for one PDF as well as for a whole batch run (merged duration lists).
+    """
+    summary = {}
+    for name, values in durations.items():
+        arr = np.asarray(values, dtype=np.float64)
+        summary[name] = {
+            "count": int(arr.size),
+            "total_ms": round(float(arr.sum()), 3),
+            "mean_ms": round(float(arr.mean()), 3),
+            "p50_ms": round(float(np.percentile(arr, 50)), 3),
+            "p95_ms": round(float(np.percentile(arr, 95)), 3),
+            "max_ms": round(float(arr.max()), 3),
+        }
+    return summary
+
+
+def current_tracer() -> Tracer | None:
+    return _current_tracer.get()
+
+
+def current_attrs() -> dict:
+    """Attributes (pdf, page, ...) set by trace_attrs in the current context."""
+    return _current_attrs.get()
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """
+    Time the enclosed block as stage `name`. No-op when no tracer is active.
+    Extra keyword attributes are stored with the span (e.g. pages=8).
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.record(name, start, time.perf_counter() - start, {**_current_attrs.get(), **attrs})
+
+
+@contextlib.contextmanager
+def trace_attrs(**attrs):
+    """Attach attributes (e.g. page=3) to every span opened inside the block."""
+    tok = _current_attrs.set({**_current_attrs.get(), **attrs})
+    try:
+        yield
+    finally:
+        _current_attrs.reset(tok)
+
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if hasattr(record, "span"):
+            entry["span"] = record.span
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(cfg=None, level: str | None = None, json_lines: bool | None = None):
+    """
+    Configure the root logger from cfg.log_level / cfg.log_json.
+    "OFF" silences the pipeline logs entirely; json_lines prints one JSON object per record.
+    """
+    level = (level or getattr(cfg, "log_level", "INFO") or "INFO").upper()
+    if json_lines is None:
+        json_lines = getattr(cfg, "log_json", False)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if getattr(handler, "_exam_manager", False):
+            root.removeHandler(handler)
+
+    if level == "OFF":
+        root.setLevel(logging.CRITICAL + 1)
+        return
+
+    handler = logging.StreamHandler()
+    handler._exam_manager = True
+    handler.setFormatter(_JsonLineFormatter() if json_lines
+                         else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level, logging.INFO))